@@ -0,0 +1,63 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# Optimization time of a script with many ALTER statements that
+# the optimizers promote into (and remove from) the model content,
+# and many indexes that are redundant with the primary key and are
+# removed by BestPractices.
+#
+# usage: alters.py [alters]
+#
+
+import schema
+from chameleon.model import Model
+from chameleon.parser import Parser
+from chameleon.optimizer import Basic, BestPractices
+
+TABLES = 1000
+
+count = schema.arg(1, 50000)
+
+script = []
+for n in range(TABLES):
+    script.append(
+        'create table t%d (a integer primary key, b integer);\n' % n)
+    script.append('create index ix%d on t%d (b);\n' % (n, n))
+for n in range(count // 2):
+    table = n % TABLES
+    script.append(
+        'alter table t%d add constraint c%d_%d check (a > %d);\n' % (
+            table,
+            table,
+            n // TABLES,
+            n))
+    script.append('alter index ix%d nologging;\n' % table)
+    script.append('create index rx%d on t%d (a);\n' % (n, table))
+script = ''.join(script)
+
+parser = Parser.get()
+
+print 'alters: %d tables, %d alters, %d redundant indexes' % (
+    TABLES,
+    count,
+    count // 2)
+for optimizer in (Basic, BestPractices):
+    model = Model(parser.parse(script))
+    seconds, model = schema.timed(optimizer({}).process, model, repeat=1)
+    print '  %-14s %6.2fs  %d statements left' % (
+        optimizer.__name__,
+        seconds,
+        len(model.content))
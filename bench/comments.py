@@ -0,0 +1,66 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# Lex and parse time of a script that is mostly block comments:
+# license headers and commented-out DDL, by each lexer.
+#
+# usage: comments.py [tables]
+#
+
+import schema
+from chameleon.parser import Parser
+
+HEADER = '''\
+ * This program is free software; you can redistribute it and/or modify
+ * it under the terms of the (LGPL) GNU Lesser General Public License as
+ * published by the Free Software Foundation; either version 3 of the
+ * License, or (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU Library Lesser General Public License for more details.'''
+
+count = schema.arg(1, 500)
+
+script = []
+for n, ddl in enumerate(schema.tables(count).split(';\n')[:-1]):
+    script.append('/*\n%s\n*/\n' % HEADER)
+    if n % 3:
+        script.append('/* %s; */\n' % ddl)
+    else:
+        script.append('%s;\n' % ddl)
+script = ''.join(script)
+
+parser = Parser.get()
+
+def lex(engine):
+    lexer = parser.lexer(engine)
+    lexer.input(script)
+    n = 0
+    while lexer.token() is not None:
+        n += 1
+    return n
+
+print 'comments: %d bytes, %d lines' % (len(script), script.count('\n'))
+for engine in Parser.lexers:
+    lexing, tokens = schema.timed(lex, engine)
+    parsing, result = schema.timed(parser.parse, script, engine)
+    print '  %-8s lex %6.2fs (%d tokens) parse %6.2fs' % (
+        engine,
+        lexing,
+        tokens,
+        parsing)
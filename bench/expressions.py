@@ -0,0 +1,60 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# Parse and render time of CHECK constraints with long IN lists,
+# AND chains and nested (parenthesized) OR terms.  Expressions are
+# built in linear time, so the time per term should stay flat as
+# the size grows.
+#
+# usage: expressions.py [terms]
+#
+
+import schema
+from chameleon.model import Model
+from chameleon.oracle import Model as Oracle
+from chameleon.parser import Parser
+
+TABLE = 'create table t (c varchar(10), constraint ck check (%s));'
+
+largest = schema.arg(1, 20000)
+
+parser = Parser.get()
+plugin = Oracle()
+
+def bench(label, n, check):
+    script = TABLE % check
+    parsing, result = schema.timed(parser.parse, script, repeat=1)
+    model = Model(result)
+    rendering, data = schema.timed(plugin.render, model, repeat=1)
+    print '  %-12s parse %6.3fs render %6.3fs  %5.1fus/term' % (
+        label,
+        parsing,
+        rendering,
+        (parsing+rendering)*1000000/n)
+
+def nested(n):
+    check = ["(c = 'V%d' OR " % i for i in range(n)]
+    check.append("c = 'x'")
+    check.append(')' * n)
+    return ''.join(check)
+
+print 'expressions:'
+n = largest // 8
+while n <= largest:
+    bench('IN %d' % n, n, 'c IN (%s)' % ', '.join("'V%d'" % i for i in range(n)))
+    bench('AND %d' % n, n, ' AND '.join("c != 'V%d'" % i for i in range(n)))
+    bench('nested %d' % n, n, nested(n))
+    n *= 2
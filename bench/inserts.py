@@ -0,0 +1,68 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# Rows/sec parsing bulk INSERT statements by the INSERT fast path
+# (Inserts) and by the grammar alone.  Both produce the same model.
+#
+# usage: inserts.py [rows]
+#
+
+import schema
+import random
+from chameleon import PrettyPrinter
+from chameleon.parser import Parser
+
+VALUES = (
+    "'name %d'",
+    "'don''t %d'",
+    '%d',
+    '-%d',
+    'sysdate',
+    'null',
+    "to_date('2010-01-%02d', 'YYYY-MM-DD')",
+    'seq_%d.nextval',
+)
+
+rows = schema.arg(1, 50000)
+
+r = random.Random(1)
+script = []
+for n in range(rows):
+    values = []
+    for value in r.sample(VALUES, 5):
+        if '%' in value:
+            value = value % (n % 28 + 1)
+        values.append(value)
+    script.append(
+        'insert into t (a, b, c, d, e) values (%s);\n' % ', '.join(values))
+script = ''.join(script)
+
+parser = Parser.get()
+
+def grammar():
+    return parser.parser.parse(script, lexer=parser.lexer())
+
+def fast():
+    return parser.parse(script)
+
+print 'inserts: %d rows, %d bytes' % (rows, len(script))
+results = []
+for name, fn in (('grammar', grammar), ('fast', fast)):
+    seconds, result = schema.timed(fn, repeat=1)
+    results.append(result)
+    print '  %-8s %7.2fs %9d rows/s' % (name, seconds, rows/seconds)
+pp = PrettyPrinter()
+assert pp.tostr(results[0]) == pp.tostr(results[1])
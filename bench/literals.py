@@ -0,0 +1,56 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# Parse time of INSERT statements with very large quoted literals
+# (with a '' escape every 20 characters) by each lexer, alongside
+# the samples.  The peak RSS is reported after each.
+#
+# usage: literals.py [megabytes ...]
+#
+
+import os
+import schema
+import resource
+from chameleon.parser import Parser
+
+SAMPLES = ('sample.sql', 'optimizer.sql', 'upgrade.sql')
+
+sizes = [int(mb) for mb in schema.sys.argv[1:]] or [1, 100]
+
+parser = Parser.get()
+
+def peak():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+
+def bench(label, script, engine, length=None):
+    seconds, result = schema.timed(parser.parse, script, engine, repeat=1)
+    if length is not None:
+        assert len(result[0].values[0]) == length
+    print '  %-14s %-8s %7.2fs  peak %dMB' % (label, engine, seconds, peak())
+
+print 'literals:'
+for fn in SAMPLES:
+    f = open(os.path.join(schema.ROOT, 'samples', fn))
+    script = f.read()
+    f.close()
+    for engine in Parser.lexers:
+        bench(fn, script, engine)
+for mb in sizes:
+    chunk = 'x' * 18 + "''"
+    literal = "'%s'" % (chunk * (mb * 0x100000 // len(chunk)))
+    script = 'insert into t (c) values (%s);' % literal
+    for engine in Parser.lexers:
+        bench('%dMB' % mb, script, engine, len(literal))
@@ -0,0 +1,45 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# Memory used by the model of a large schema: the growth of the
+# resident set and the number of objects tracked by the collector.
+#
+# usage: memory.py [tables]
+#
+
+import gc
+import schema
+from chameleon.model import Model
+from chameleon.parser import Parser
+
+count = schema.arg(1, 20000)
+
+def rss():
+    """ get the resident set size (MB) """
+    return schema.status('VmRSS')
+
+script = schema.tables(count)
+parser = Parser.get()
+gc.collect()
+base = rss()
+objects = len(gc.get_objects())
+seconds, model = schema.timed(parser.parse, script, repeat=1)
+model = Model(model)
+gc.collect()
+print 'memory: %d tables, %d statements' % (count, len(model.content))
+print '  rss     +%7.1fMB' % (rss()-base)
+print '  objects +%7d' % (len(gc.get_objects())-objects)
+print '  parse    %7.2fs' % seconds
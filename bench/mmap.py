@@ -0,0 +1,74 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# Memory used to parse a large script file that is mapped (as the
+# files named on the command line are) or read into a string.  Each
+# is parsed in its own process so that the peaks are comparable;
+# the mapped pages are file backed (clean) and not anonymous.
+#
+# usage: mmap.py [tables]
+#
+
+import os
+import sys
+import tempfile
+import subprocess
+import schema
+from chameleon.parser import Parser, mapped
+
+count = schema.arg(1, 10000)
+
+FIELDS = ('RssAnon', 'VmRSS', 'VmHWM')
+
+
+def measure(mode, fn):
+    """ parse the file (mapped|read) and print the growth (MB) """
+    parser = Parser.get()
+    base = [schema.status(x) for x in FIELDS]
+    f = open(fn)
+    try:
+        if mode == 'mapped':
+            input = mapped(f)
+        else:
+            input = f.read()
+        seconds, script = schema.timed(parser.parse, input, repeat=1)
+        grown = [schema.status(x) for x in FIELDS]
+        if mode == 'mapped':
+            input.close()
+    finally:
+        f.close()
+    growth = [b-a for a, b in zip(base, grown)]
+    print '  %-6s  +%7.1f  +%7.1f  +%7.1f  %7.2fs' % \
+        tuple([mode] + growth + [seconds])
+
+
+if len(sys.argv) > 3:
+    measure(sys.argv[2], sys.argv[3])
+    sys.exit(0)
+
+fd, fn = tempfile.mkstemp(suffix='.sql')
+try:
+    f = os.fdopen(fd, 'w')
+    f.write(schema.tables(count))
+    f.close()
+    print 'mmap: %d tables, %.1fMB' % (count, os.path.getsize(fn) / 1048576.)
+    print '  input   anon(MB)   rss(MB)  peak(MB)    parse'
+    sys.stdout.flush()
+    for mode in ('read', 'mapped'):
+        subprocess.check_call(
+            [sys.executable, os.path.abspath(__file__), str(count), mode, fn])
+finally:
+    os.unlink(fn)
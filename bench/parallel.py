@@ -0,0 +1,47 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# Parse time of a large script by the parallel parser (--jobs)
+# scaling from 1 to N workers, compared with the serial parser.
+#
+# usage: parallel.py [tables] [workers]
+#
+
+import schema
+import multiprocessing
+from chameleon.parser import Parser, Workers, parse
+
+count = schema.arg(1, 5000)
+jobs = schema.arg(2, multiprocessing.cpu_count())
+
+script = schema.tables(count)
+Parser.get()
+
+print 'parallel: %d tables, %d lines, %d cpu' % (
+    count,
+    script.count('\n'),
+    multiprocessing.cpu_count())
+
+serial, parsed = schema.timed(parse, script, repeat=1)
+print '  serial    %7.2fs' % serial
+
+for n in range(1, jobs+1):
+    workers = Workers(n)
+    workers.parse('create table warm (id integer);')
+    seconds, result = schema.timed(workers.parse, script, repeat=1)
+    workers.pool.terminate()
+    assert len(result) == len(parsed)
+    print '  jobs: %-3d %7.2fs  x%.2f' % (n, seconds, serial/seconds)
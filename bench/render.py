@@ -0,0 +1,84 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# Render time of a wide-table schema by each style, and the time
+# spent by the plugin factory resolving (get) and sorting the
+# column modifiers and the content.
+#
+# usage: render.py [tables] [columns]
+#
+
+import schema
+from chameleon.model import Model
+from chameleon.parser import Parser
+from chameleon.oracle import Model as Oracle
+from chameleon.postgres import Model as Postgres
+
+COLUMNS = (
+    'c%(n)d number(10) default (0) not null check (c%(n)d >= 0)',
+    'c%(n)d varchar(40) not null unique',
+    'c%(n)d number(19) references t%(ref)d (c0) on delete cascade',
+    'c%(n)d date default (sysdate)',
+)
+
+count = schema.arg(1, 500)
+width = schema.arg(2, 60)
+
+script = []
+for t in range(count):
+    columns = []
+    for n in range(width):
+        column = COLUMNS[n % len(COLUMNS)]
+        columns.append(column % dict(n=n, ref=max(t-1, 0)))
+    columns.append('constraint t%d_pk primary key (c0)' % t)
+    script.append(
+        'create table t%d (\n  %s\n);\n' % (t, ',\n  '.join(columns)))
+script = ''.join(script)
+
+model = Model(Parser.get().parse(script))
+
+print 'render: %d tables, %d columns' % (count, width)
+for plugin in (Oracle(), Postgres()):
+    for sort in (False, True):
+        plugin.factory.options = {'sort': sort}
+        seconds, data = schema.timed(plugin.render, model)
+        print '  %-9s sort: %-5s %6.3fs' % (
+            plugin.__module__.split('.')[-1],
+            sort,
+            seconds)
+
+factory = Oracle().factory
+modifiers = []
+for table in model.tables.values():
+    for column in table.columns:
+        modifiers.append(column.modifiers)
+content = list(model.content) * 20
+
+def get():
+    for items in modifiers:
+        for x in items:
+            factory.get(x)
+
+def sort():
+    for items in modifiers:
+        factory.sorted(items)
+
+seconds, result = schema.timed(get, repeat=5)
+print '  get(modifier)      %6.3fs' % seconds
+seconds, result = schema.timed(sort, repeat=5)
+print '  sorted(modifiers)  %6.3fs' % seconds
+seconds, result = schema.timed(factory.sorted, content, repeat=5)
+print '  sorted(content)    %6.3fs  (%d statements)' % (seconds, len(content))
@@ -0,0 +1,94 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# Shared by the benchmarks: generated schemas and timing.  The
+# benchmarks generate their input so that nothing large is kept
+# in the tree.  Run them from the top of the tree (make bench).
+#
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BENCH = os.path.join(ROOT, 'bench')
+
+# the benchmarks are run as scripts so (bench) leads the path
+# and bench/mmap.py would shadow the mmap module.
+sys.path = [p for p in sys.path if os.path.abspath(p or '.') != BENCH]
+sys.path.insert(0, ROOT)
+
+TABLE = """\
+create table t%(n)d
+(
+  id number(19) primary key,
+  name varchar(20) not null unique, -- comment
+  age number(1) default (1) check (age > 0 and age < 100),
+  ref_id number(19) references t%(ref)d (id) on delete cascade
+) tablespace [[ data_ts ]];
+create index t%(n)d_ix on t%(n)d (name, age) tablespace [[ index_ts ]];
+insert into t%(n)d (id, name, age) values (1, 'don''t', sysdate);
+"""
+
+
+def tables(count):
+    """
+    Generate a schema of (count) tables.  Each table references
+    the one before it and has an index and an insert.
+    @rtype: str
+    """
+    script = []
+    for n in range(count):
+        script.append(TABLE % dict(n=n, ref=max(n-1, 0)))
+    return ''.join(script)
+
+
+def arg(index, default):
+    """ get the (int) command line argument at index """
+    try:
+        return int(sys.argv[index])
+    except IndexError:
+        return default
+
+
+def status(name):
+    """ get a (kB) field of /proc/self/status in MB """
+    f = open('/proc/self/status')
+    try:
+        for line in f:
+            if line.startswith(name + ':'):
+                return int(line.split()[1]) / 1024.
+    finally:
+        f.close()
+    return 0.
+
+
+def timed(fn, *args, **options):
+    """
+    Call fn(*args) (repeat) times.
+    @return: (seconds, result) with the fastest time.
+    @rtype: tuple
+    """
+    repeat = options.get('repeat', 3)
+    best = None
+    for n in range(repeat):
+        t0 = time.time()
+        result = fn(*args)
+        seconds = time.time() - t0
+        if best is None or seconds < best:
+            best = seconds
+    return (best, result)
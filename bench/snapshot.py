@@ -0,0 +1,73 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# Time to load a large schema from a snapshot (--snapshot) compared
+# with parsing and optimizing the script.
+#
+# usage: snapshot.py [tables]
+#
+
+import os
+import shutil
+import schema
+import tempfile
+from chameleon.model import Model
+from chameleon.parser import Parser
+from chameleon.optimizer import BestPractices
+from chameleon.snapshot import Snapshot
+
+count = schema.arg(1, 20000)
+
+script = schema.tables(count)
+parser = Parser.get()
+tmp = tempfile.mkdtemp()
+path = os.path.join(tmp, 'schema.snap')
+
+def process():
+    optimizer = BestPractices({})
+    model = optimizer.process(Model(parser.parse(script)))
+    return (model, optimizer)
+
+def load():
+    optimizer = BestPractices({})
+    snapshot = Snapshot.load(path)
+    optimizer.restore(snapshot.warnings)
+    return (Model(snapshot.content), optimizer)
+
+try:
+    processing, (model, optimizer) = schema.timed(process, repeat=1)
+    snapshot = Snapshot(
+        model.content,
+        optimizer.__class__.__name__,
+        optimizer.exported())
+    saving, result = schema.timed(snapshot.save, path, repeat=1)
+    loading, (loaded, restored) = schema.timed(load)
+    assert len(loaded.content) == len(model.content)
+    assert len(restored.warnings) == len(optimizer.warnings)
+    print 'snapshot: %d tables, %d warnings' % (
+        count,
+        len(optimizer.warnings))
+    print '  parse+optimize %6.2fs  %6.1fMB script' % (
+        processing,
+        len(script) / 1048576.)
+    print '  save           %6.2fs  %6.1fMB snapshot' % (
+        saving,
+        os.path.getsize(path) / 1048576.)
+    print '  load           %6.2fs  x%.1f' % (
+        loading,
+        processing/loading)
+finally:
+    shutil.rmtree(tmp)
@@ -0,0 +1,75 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# Time to render a large schema to oracle and postgres by one run
+# (--style oracle,postgres) that parses and optimizes once, compared
+# with two sequential runs (one per style).
+#
+# usage: styles.py [tables]
+#
+
+import os
+import sys
+import time
+import shutil
+import schema
+import tempfile
+import subprocess
+
+count = schema.arg(1, 5000)
+
+tmp = tempfile.mkdtemp()
+path = os.path.join(tmp, 'schema.sql')
+
+def chameleon(*options):
+    env = dict(os.environ)
+    pythonpath = [schema.ROOT] + filter(None, [env.get('PYTHONPATH')])
+    env['PYTHONPATH'] = os.pathsep.join(pythonpath)
+    command = [sys.executable, os.path.join(schema.ROOT, 'chameleon.bin')]
+    command += ['-O', 'best']
+    command += options
+    null = open(os.devnull, 'w')
+    try:
+        t0 = time.time()
+        status = subprocess.call(command, cwd=tmp, env=env, stdout=null)
+        seconds = time.time() - t0
+    finally:
+        null.close()
+    assert status == 0, status
+    return seconds
+
+try:
+    f = open(path, 'w')
+    f.write(schema.tables(count))
+    f.close()
+    print 'styles: %d tables' % count
+    oracle = chameleon('-s', 'oracle', '-o', 'oracle.sql', path)
+    postgres = chameleon('-s', 'postgres', '-o', 'postgres.sql', path)
+    both = chameleon('-s', 'oracle,postgres', '-o', 'both.sql', path)
+    print '  oracle           %6.2fs' % oracle
+    print '  postgres         %6.2fs' % postgres
+    print '  sequential       %6.2fs' % (oracle+postgres)
+    print '  oracle,postgres  %6.2fs' % both
+    for style in ('oracle', 'postgres'):
+        f = open(os.path.join(tmp, '%s.sql' % style))
+        single = f.read()
+        f.close()
+        f = open(os.path.join(tmp, 'both.%s.sql' % style))
+        multiple = f.read()
+        f.close()
+        assert single == multiple, style
+finally:
+    shutil.rmtree(tmp)
@@ -26,6 +26,7 @@ rm -rf $RPM_BUILD_ROOT
 mkdir -p $RPM_BUILD_ROOT/%{_bindir}
 mkdir -p $RPM_BUILD_ROOT/%{chameleon_home}
 cp -p chameleon/*.py $RPM_BUILD_ROOT/%{chameleon_home}
+cp -p chameleon/parsetab-*.pickle $RPM_BUILD_ROOT/%{chameleon_home}
 install -m 0755 chameleon.bin $RPM_BUILD_ROOT/%{_bindir}/chameleon
 
 %clean
@@ -48,12 +48,18 @@ class PrettyPrinter:
         if isinstance(pyobj, (basestring, bool, int)):
             return '"%s"' % str(pyobj)
         if isinstance(pyobj, object):
-            if pyobj.__dict__:
+            if self.attributes(pyobj):
                 return self.printObject(pyobj, h, n+2, nl)
             else:
                 return '<empty>'
         return '%s' % self.process(pyobj)
     
+    def attributes(self, pyobj):
+        """ get the attributes of pyobj; model nodes use slots. """
+        if hasattr(pyobj, '__getstate__'):
+            return pyobj.__getstate__()
+        return pyobj.__dict__
+    
     def printObject(self, d, h, n, nl=False):
         """ print complex using the specified indent (n) and newline (nl). """
         s = []
@@ -74,7 +80,7 @@ class PrettyPrinter:
         s.append('\n')
         s.append(self.indent(n))
         s.append('{')
-        for item in d.__dict__.items():
+        for item in self.attributes(d).items():
             if item[0].startswith('_'):
                 continue
             s.append('\n')
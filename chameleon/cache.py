@@ -0,0 +1,160 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+import os
+import cPickle as pickle
+
+try:
+    from hashlib import md5
+except ImportError:
+    from md5 import new as md5
+
+
+class Cache:
+    """
+    A persistent cache of parsed statements.  Maps the digest of the
+    (stripped) statement text to the pickled list of model objects
+    produced by parsing it.  Entries are loaded as fresh copies so
+    the optimizers may mutate them freely.
+    The cache file is named by the digest of the models produced by
+    parsing (see L{chameleon.parser.Tables.models}) so a change to the
+    grammar, its actions or the model classes invalidates the cache;
+    files for other digests are removed when the cache is saved.
+    When the pickled entries exceed the size limit, the least
+    recently used entries are evicted.
+    @ivar path: The path to the cache file.
+    @type path: str
+    @ivar limit: The size limit (bytes).
+    @type limit: int
+    @ivar entries: The cached entries: {key:[tick,pickled]}
+    @type entries: dict
+    """
+
+    version = 1
+
+    prefix = 'statements-'
+
+    def __init__(self, cachedir, digest, limit=64*1024*1024):
+        self.cachedir = cachedir
+        self.path = os.path.join(cachedir, '%s%s.pickle' % (self.prefix, digest))
+        self.limit = limit
+        self.entries = {}
+        self.tick = 0
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.load()
+
+    def key(self, statement):
+        return md5(statement.strip()).digest()
+
+    def get(self, key):
+        """
+        Get the (unpickled) model objects for the statement key.
+        @return: The list of model objects or None when not cached.
+        @rtype: list
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.tick += 1
+        entry[0] = self.tick
+        return pickle.loads(entry[1])
+
+    def put(self, key, script):
+        pickled = pickle.dumps(script, pickle.HIGHEST_PROTOCOL)
+        self.tick += 1
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.size -= len(entry[1])
+        self.entries[key] = [self.tick, pickled]
+        self.size += len(pickled)
+        if self.size > self.limit:
+            self.evict()
+
+    def evict(self):
+        """
+        Evict the least recently used entries until the cache is
+        within 90% of its size limit.
+        """
+        target = self.limit * 9 / 10
+        lru = sorted(self.entries.items(), key=lambda e: e[1][0])
+        for key, entry in lru:
+            if self.size <= target:
+                break
+            del self.entries[key]
+            self.size -= len(entry[1])
+            self.evicted += 1
+
+    def load(self):
+        try:
+            f = open(self.path, 'rb')
+            try:
+                version = pickle.load(f)
+                if version != self.version:
+                    return
+                self.tick, self.entries = pickle.load(f)
+            finally:
+                f.close()
+        except (IOError, EOFError, pickle.UnpicklingError):
+            self.entries = {}
+            return
+        for entry in self.entries.values():
+            self.size += len(entry[1])
+        if self.size > self.limit:
+            self.evict()
+
+    def save(self):
+        """
+        Save the cache.  The file is written to a private file and
+        renamed into place so concurrent processes never read a
+        partial file.  Caches for other digests are removed.
+        """
+        try:
+            if not os.path.isdir(self.cachedir):
+                os.makedirs(self.cachedir)
+            tmp = '%s.%d.tmp' % (self.path, os.getpid())
+            f = open(tmp, 'wb')
+            try:
+                pickle.dump(self.version, f, pickle.HIGHEST_PROTOCOL)
+                pickle.dump((self.tick, self.entries), f, pickle.HIGHEST_PROTOCOL)
+            finally:
+                f.close()
+            os.rename(tmp, self.path)
+            self.purge()
+        except (IOError, OSError), e:
+            print 'statement cache: "%s" not saved, %s' % (self.path, e)
+
+    def purge(self):
+        """ remove caches for other digests """
+        current = os.path.basename(self.path)
+        for fn in os.listdir(self.cachedir):
+            if fn == current:
+                continue
+            if fn.startswith(self.prefix) and fn.endswith('.pickle'):
+                os.unlink(os.path.join(self.cachedir, fn))
+
+    def report(self):
+        s = []
+        s.append('statement cache:')
+        s.append('%*s: %s' % (4, self.hits, 'hits'))
+        s.append('%*s: %s' % (4, self.misses, 'misses'))
+        s.append('%*s: %s' % (4, self.evicted, 'evicted'))
+        s.append('%*s: %s' % (4, len(self.entries), 'entries'))
+        s.append('%*s: %s' % (4, self.size, 'bytes'))
+        return '\n'.join(s)
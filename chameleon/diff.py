@@ -0,0 +1,497 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+from chameleon.model import *
+
+
+class Differ:
+    """
+    Compares two models (schemas) and builds the statements that
+    change the old schema into the new one: RENAME, ADD, MODIFY and
+    DROP (ALTER TABLE) statements for tables that are in both and
+    CREATE and DROP statements for the others.
+    Objects are matched by name (see L{key}).  Tables and columns
+    that are not matched by name are matched by signature (see
+    L{match}) and renamed rather than dropped and created.  Columns
+    are compared by type, default and (not null); constraints and
+    indexes by kind and (renamed) columns.  Table and index modifiers
+    (tablespace, logging, ...) are not compared.
+    Some changes cannot be expressed by the model and are reported
+    in L{skipped} instead: dropping anonymous constraints, dropping
+    (not null) and changing sequences.
+    @ivar old: The old model.
+    @type old: L{Model}
+    @ivar new: The new model.
+    @type new: L{Model}
+    @ivar tablemap: The new names of (matched) old tables: {key:key}
+    @type tablemap: dict
+    @ivar columnmap: The renamed columns of (matched) old tables:
+        {table:{key:key}}
+    @type columnmap: dict
+    @ivar statements: The statements by phase: {phase:[statement,]}
+    @type statements: dict
+    @ivar skipped: Descriptions of the changes that were skipped.
+    @type skipped: list
+    """
+
+    phases = (
+        'rename',
+        'dropfk',
+        'dropconstraint',
+        'dropindex',
+        'dropcolumn',
+        'drop',
+        'create',
+        'addcolumn',
+        'modify',
+        'addconstraint',
+        'addfk',
+        'index',
+        'synonym',
+    )
+
+    def __init__(self, old, new):
+        self.old = old
+        self.new = new
+        self.tablemap = {}
+        self.columnmap = {}
+        self.statements = {}
+        for phase in self.phases:
+            self.statements[phase] = []
+        self.skipped = []
+
+    def diff(self):
+        """
+        Compare the models.
+        @return: A model of the statements, in the order they
+            must be applied.
+        @rtype: L{Model}
+        """
+        old = [c for c in self.old.content if isinstance(c, Table)]
+        new = [c for c in self.new.content if isinstance(c, Table)]
+        pairs, dropped, created = self.match(old, new, (self.structure, self.shape))
+        for a, b in pairs:
+            self.tablemap[key(a.name)] = key(b.name)
+            if key(a.name) != key(b.name):
+                rename = Rename(Rename.Table(a.name, b.name))
+                self.add('rename', Alter.Table(a.name, mods=[rename]))
+        excluded = []
+        for a, b in pairs:
+            excluded.append(self.columns(a, b))
+        for (a, b), (dropcolumns, addcolumns) in zip(pairs, excluded):
+            self.constraints(a, b, dropcolumns, addcolumns)
+        self.sequences()
+        for t in dropped:
+            self.add('drop', Drop('table', t.name))
+        for t in created:
+            self.add('create', t)
+        self.indexes()
+        self.synonyms()
+        content = []
+        for phase in self.phases:
+            content += self.statements[phase]
+        return Model(content)
+
+    def add(self, phase, statement):
+        self.statements[phase].append(statement)
+
+    def match(self, old, new, signatures=()):
+        """
+        Match old and new objects by name.  The objects remaining are
+        then matched by each of the signature functions in turn; an
+        old and new object match when their signature is unique to
+        them among those remaining.
+        @param old: The old objects.
+        @type old: list
+        @param new: The new objects.
+        @type new: list
+        @param signatures: Signature functions: fn(object).
+        @type signatures: list
+        @return: ([(old,new),], dropped, created)
+        @rtype: tuple
+        """
+        byname = {}
+        for x in old:
+            byname[key(x.name)] = x
+        pairs = []
+        created = []
+        for x in new:
+            y = byname.pop(key(x.name), None)
+            if y is None:
+                created.append(x)
+            else:
+                pairs.append((y, x))
+        dropped = [x for x in old if byname.get(key(x.name)) is x]
+        for signature in signatures:
+            if not dropped or not created:
+                break
+            olds = self.bysignature(dropped, signature)
+            news = self.bysignature(created, signature)
+            renamed = {}
+            for s, xs in news.items():
+                ys = olds.get(s, ())
+                if len(xs) == 1 and len(ys) == 1:
+                    renamed[xs[0]] = ys[0]
+            if not renamed:
+                continue
+            matched = set(renamed.values())
+            pairs += [(renamed[x], x) for x in created if x in renamed]
+            dropped = [x for x in dropped if x not in matched]
+            created = [x for x in created if x not in renamed]
+        return (pairs, dropped, created)
+
+    def bysignature(self, objects, signature):
+        result = {}
+        for x in objects:
+            result.setdefault(signature(x), []).append(x)
+        return result
+
+    def structure(self, table):
+        """ get the signature of a table: its columns (by name) """
+        return tuple([(key(c.name), self.definition(c)) for c in table.columns])
+
+    def shape(self, table):
+        """ get the signature of a table: its column names """
+        return tuple([key(c.name) for c in table.columns])
+
+    def definition(self, column):
+        """ get the signature of a column: (type, default, not null) """
+        t, d, nn = self.modifiers(column)
+        return (signature(t), signature(d), nn is not None)
+
+    def modifiers(self, column):
+        """ get the type, default and (not null) modifiers of a column """
+        result = [None, None, None]
+        for m in column.modifiers:
+            if isinstance(m, Type):
+                result[0] = m
+            elif isinstance(m, Default):
+                result[1] = m
+            elif isinstance(m, NotNull):
+                result[2] = m
+        return result
+
+    def columns(self, a, b):
+        """
+        Compare the columns of the matched (old) and (new) tables.
+        @return: The keys of the (dropped,added) columns.
+        @rtype: tuple
+        """
+        pairs, dropped, added = self.match(a.columns, b.columns, (self.definition,))
+        renamed = {}
+        changed = []
+        for x, y in pairs:
+            if key(x.name) != key(y.name):
+                renamed[key(x.name)] = key(y.name)
+                rename = Rename(Rename.Column(x.name, y.name))
+                self.add('rename', Alter.Table(b.name, mods=[rename]))
+            column = self.modified(b, x, y)
+            if column is not None:
+                changed.append(column)
+        self.columnmap[key(a.name)] = renamed
+        if changed:
+            self.add('modify', Alter.Table(b.name, mods=[Modify(changed)]))
+        for x in dropped:
+            drop = Drop('column', x.name)
+            self.add('dropcolumn', Alter.Table(b.name, drops=[drop]))
+        for y in added:
+            self.add('addcolumn', Alter.Table(b.name, adds=[y]))
+        return (set([key(x.name) for x in dropped]),
+                set([key(y.name) for y in added]))
+
+    def modified(self, table, x, y):
+        """
+        Get the (MODIFY) column with the modifiers of the (new) column
+        that differ from the (old) column.
+        @return: The column or None when not changed.
+        @rtype: L{Column}
+        """
+        old = self.definition(x)
+        new = self.definition(y)
+        if old == new:
+            return None
+        t, d, nn = self.modifiers(y)
+        column = Column(y.name)
+        if old[0] != new[0] and t is not None:
+            column.modifiers.append(t)
+        if old[1] != new[1]:
+            if d is None:
+                column.modifiers.append(Default('NULL'))
+            else:
+                column.modifiers.append(d)
+        if new[2] and not old[2]:
+            column.modifiers.append(NotNull())
+        if old[2] and not new[2]:
+            self.skipped.append(
+                'NOT NULL on "%s.%s", not dropped' % (table.name, y.name))
+        if column.modifiers:
+            return column
+        return None
+
+    def constraints(self, a, b, dropcolumns, addcolumns):
+        """
+        Compare the (table and column) constraints of the matched
+        (old) and (new) tables.  Constraints of dropped columns are
+        dropped with them and those of added columns are added
+        with them.  A constraint matches one with the same signature
+        and name; anonymous constraints match any name.
+        """
+        old = {}
+        for c, column in self.tableconstraints(a, dropcolumns):
+            s = self.constraint(a, c, column, True)
+            old.setdefault(s, []).append(c)
+        added = []
+        for c, column in self.tableconstraints(b, addcolumns):
+            s = self.constraint(b, c, column)
+            candidates = old.get(s)
+            if candidates:
+                found = self.named(candidates, c)
+                if found is not None:
+                    candidates.remove(found)
+                    continue
+            added.append((c, column))
+        for candidates in old.values():
+            for c in candidates:
+                if c.anonymous():
+                    self.skipped.append(
+                        'anonymous (%s) constraint on "%s", not dropped'
+                        % (self.kind(c), b.name))
+                    continue
+                drop = Drop('constraint', c.name)
+                if isinstance(c, FK):
+                    phase = 'dropfk'
+                else:
+                    phase = 'dropconstraint'
+                self.add(phase, Alter.Table(b.name, drops=[drop]))
+        for c, column in added:
+            c = self.tableconstraint(b, c, column)
+            if isinstance(c, FK):
+                phase = 'addfk'
+            else:
+                phase = 'addconstraint'
+            self.add(phase, Alter.Table(b.name, adds=[c]))
+
+    def tableconstraints(self, table, excluded):
+        """
+        Get the table and column constraints of the table, but not
+        those of the (excluded) columns.
+        @return: [(constraint,column),]
+        @rtype: list
+        """
+        result = []
+        for c in table.constraints:
+            if isinstance(c, Constraint):
+                result.append((c, None))
+        for column in table.columns:
+            if key(column.name) in excluded:
+                continue
+            for m in column.modifiers:
+                if isinstance(m, Constraint):
+                    result.append((m, column))
+        return result
+
+    def constraint(self, table, c, column, old=False):
+        """
+        Get the signature of a (table or column) constraint.  The
+        names in old constraints are the (renamed) new names.
+        """
+        names = {}
+        if old:
+            names = self.columnmap.get(key(table.name), {})
+        if isinstance(c, FK):
+            if column is None:
+                columns = c.refA.columns
+            else:
+                columns = [column.name]
+            reftable = key(c.refB.table)
+            refnames = {}
+            if old:
+                refnames = self.columnmap.get(reftable, {})
+                reftable = self.tablemap.get(reftable, reftable)
+            return ('FK',
+                    keys(columns, names),
+                    reftable,
+                    keys(c.refB.columns or (), refnames),
+                    c.ondelete.__class__)
+        if isinstance(c, CkMod):
+            return ('CK', signature(c.expression, names))
+        if column is None:
+            columns = c.columns
+        else:
+            columns = [column.name]
+        if isinstance(c, PK):
+            return ('PK', keys(columns, names))
+        return ('UQ', keys(columns, names))
+
+    def named(self, candidates, c):
+        """
+        Get the candidate (constraint) with the same name as the
+        constraint; anonymous constraints match any name.
+        """
+        for x in candidates:
+            if x.named() and c.named() and key(x.name) == key(c.name):
+                return x
+        for x in candidates:
+            if x.anonymous() or c.anonymous():
+                return x
+        return None
+
+    def tableconstraint(self, table, c, column):
+        """
+        Get the equivalent (named) table constraint of a constraint
+        added to an existing table.  Anonymous constraints are named
+        <table>[_<column>]_<kind>.
+        """
+        name = c.name
+        if name is None:
+            if column is None:
+                name = '%s_%s' % (table.name, self.kind(c))
+            else:
+                name = '%s_%s_%s' % (table.name, column.name, self.kind(c))
+        if column is None and name == c.name:
+            return c
+        if column is None:
+            columns = getattr(c, 'columns', None)
+        else:
+            columns = [column.name]
+        if isinstance(c, PK):
+            result = PK(name, columns)
+            result.modifiers = c.modifiers
+            return result
+        if isinstance(c, Unique):
+            result = Unique(name, columns)
+            result.modifiers = c.modifiers
+            return result
+        if isinstance(c, FK):
+            result = FK(name)
+            if column is None:
+                result.refA = c.refA
+            else:
+                result.refA = FK.Reference(table.name, columns)
+            result.refB = c.refB
+            result.ondelete = c.ondelete
+            return result
+        return CkMod(name, c.expression)
+
+    def kind(self, c):
+        """ get the kind of constraint: (pk|fk|ck|uq) """
+        if isinstance(c, PK):
+            return 'pk'
+        if isinstance(c, FK):
+            return 'fk'
+        if isinstance(c, CkMod):
+            return 'ck'
+        return 'uq'
+
+    def indexes(self):
+        """
+        Compare the indexes.  Indexes on dropped tables are dropped
+        with them.  Changed indexes are dropped and created.
+        """
+        old = []
+        for i in self.old.content:
+            if isinstance(i, Index) and key(i.table) in self.tablemap:
+                old.append(i)
+        new = [i for i in self.new.content if isinstance(i, Index)]
+        pairs, dropped, created = self.match(old, new)
+        for x, y in pairs:
+            if self.index(x, True) != self.index(y):
+                dropped.append(x)
+                created.append(y)
+        for i in dropped:
+            self.add('dropindex', Drop('index', i.name))
+        for i in created:
+            self.add('index', i)
+
+    def index(self, i, old=False):
+        """ get the signature of an index """
+        table = key(i.table)
+        names = {}
+        if old:
+            names = self.columnmap.get(table, {})
+            table = self.tablemap.get(table, table)
+        return (table, keys(i.columns, names), bool(i.unique))
+
+    def sequences(self):
+        """
+        Compare the sequences.  Changed sequences are not recreated
+        (which would restart them).
+        """
+        old = [c for c in self.old.content if isinstance(c, Sequence)]
+        new = [c for c in self.new.content if isinstance(c, Sequence)]
+        pairs, dropped, created = self.match(old, new)
+        for x, y in pairs:
+            if signature(x) != signature(y):
+                self.skipped.append(
+                    'sequence "%s" changed, not recreated' % y.name)
+        for s in dropped:
+            self.add('drop', Drop('sequence', s.name))
+        for s in created:
+            self.add('create', s)
+
+    def synonyms(self):
+        """ compare the synonyms; changed synonyms are recreated """
+        old = {}
+        for c in self.old.synonyms:
+            old[key(c.synonym)] = c
+        for c in self.new.synonyms:
+            x = old.pop(key(c.synonym), None)
+            if x is not None and signature(x) == signature(c):
+                continue
+            if x is not None:
+                self.add('drop', Drop('synonym', x.synonym))
+            self.add('synonym', c)
+        for c in self.old.synonyms:
+            if old.get(key(c.synonym)) is c:
+                self.add('drop', Drop('synonym', c.synonym))
+
+    def report(self):
+        s = []
+        s.append('diff: %d statements' % sum(map(len, self.statements.values())))
+        for x in self.skipped:
+            s.append('  skipped: %s' % x)
+        return '\n'.join(s)
+
+
+def keys(names, renamed={}):
+    """ get the (renamed) keys of the names """
+    result = []
+    for n in names:
+        if isinstance(n, basestring):
+            k = key(n)
+            n = renamed.get(k, k)
+        result.append(n)
+    return tuple(result)
+
+def signature(x, renamed={}):
+    """
+    Get the signature of a node: a hashable value that is equal
+    for nodes of the same class and (recursively) equal attributes.
+    Identifiers are compared by key and may be renamed (renamed)
+    while quoted literals are compared as spelled.
+    """
+    if isinstance(x, basestring):
+        if x[:1] in ("'", '"'):
+            return x
+        k = key(x)
+        return renamed.get(k, k)
+    if isinstance(x, (list, tuple)):
+        return tuple([signature(y, renamed) for y in x])
+    if isinstance(x, Node):
+        result = [x.__class__]
+        for name in fields(x.__class__):
+            result.append(signature(getattr(x, name, None), renamed))
+        return tuple(result)
+    return x
@@ -0,0 +1,318 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+from chameleon.model import *
+
+
+class Folder:
+    """
+    Folds the schema changes (upgrade history) in a model into the
+    objects they change, so that the model is the equivalent script
+    of CREATE statements.  The statements are applied in order:
+      - ALTER TABLE adds, drops, renames, MODIFY and table modifiers.
+      - ALTER INDEX modifiers.
+      - DROP TABLE|INDEX|SEQUENCE|SYNONYM.
+    Renamed tables and columns are renamed in the FKs that reference
+    them, in index columns, in constraint columns and check
+    expressions, and in the INSERT and COMMENT statements that
+    remain.  Dropping a column drops the constraints and indexes on
+    it, its values in the INSERT statements and its COMMENT statements;
+    dropping a table drops its indexes and the INSERT and COMMENT
+    statements for it.
+    Changes to objects that are not created in the model (or changes
+    that cannot be applied) are left in place.
+    @ivar model: The model.
+    @type model: L{Model}
+    @ivar objects: The current objects by type and name:
+        {class:{key:node}}
+    @type objects: dict
+    @ivar statements: The INSERT, COMMENT and (partly applied) ALTER
+        TABLE statements by table name: {key:[statement,]}
+    @type statements: dict
+    @ivar folded: The number of statements folded.
+    @type folded: int
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.objects = {
+            Table:{},
+            Index:{},
+            Sequence:{},
+            Synonym:{},
+        }
+        self.statements = {}
+        self.folded = 0
+
+    def fold(self):
+        """
+        Fold the model content.
+        @return: The model.
+        @rtype: L{Model}
+        """
+        for x in list(self.model.content):
+            if isinstance(x, (Table, Index, Sequence)):
+                self.objects[x.__class__][key(x.name)] = x
+                continue
+            if isinstance(x, Synonym):
+                self.objects[Synonym][key(x.synonym)] = x
+                continue
+            if isinstance(x, (Insert, TableComment)):
+                self.statements.setdefault(key(x.table), []).append(x)
+                continue
+            if isinstance(x, Alter.Table):
+                done = self.alter(x)
+            elif isinstance(x, Alter.Index):
+                done = self.alterindex(x)
+            elif isinstance(x, Drop):
+                done = self.drop(x.object)
+            else:
+                continue
+            if done:
+                self.model.remove(x)
+                self.folded += 1
+        return self.model
+
+    def alter(self, alter):
+        """
+        Apply the ALTER TABLE.  The parts applied are removed.
+        @return: True when all parts were applied.
+        @rtype: bool
+        """
+        table = self.objects[Table].get(key(alter.table))
+        if table is None:
+            return False
+        alter.adds = [a for a in alter.adds if not self.add(table, a)]
+        alter.mods = [m for m in alter.mods if not self.modify(table, m)]
+        alter.drops = [d for d in alter.drops if not self.drop(d.object, table)]
+        if len(alter):
+            self.statements.setdefault(key(table.name), []).append(alter)
+            return False
+        return True
+
+    def add(self, table, a):
+        if isinstance(a, Column):
+            self.model.addcolumn(table, a)
+            return True
+        if isinstance(a, Constraint):
+            self.model.addconstraint(table, a)
+            return True
+        table.modifiers.append(a)
+        return True
+
+    def modify(self, table, m):
+        if isinstance(m, Rename):
+            if isinstance(m.object, Rename.Table):
+                self.renametable(table, m.object.newname)
+                return True
+            return self.renamecolumn(table, m.object.name, m.object.newname)
+        if isinstance(m, Modify):
+            columns = [self.model.column(table, c.name) for c in m.columns]
+            if None in columns:
+                return False
+            for column, changed in zip(columns, m.columns):
+                self.modifycolumn(column, changed)
+            return True
+        table.modifiers.append(m)
+        return True
+
+    def modifycolumn(self, column, changed):
+        """
+        Apply the modifiers of a (MODIFY) column: the type, default
+        and (not null) replace those of the column; constraints
+        are added.
+        """
+        model = self.model
+        for m in changed.modifiers:
+            replaced = None
+            if isinstance(m, Type):
+                replaced = Type
+            elif isinstance(m, Default):
+                replaced = Default
+            elif isinstance(m, NotNull):
+                replaced = NotNull
+            if replaced is not None:
+                for old in column.modifiers[:]:
+                    if isinstance(old, replaced):
+                        model.removemodifier(column, old)
+            model.addmodifier(column, m)
+
+    def drop(self, d, table=None):
+        """
+        Apply a DROP.  Columns and constraints are dropped from
+        the (altered) table.
+        @return: True when applied.
+        @rtype: bool
+        """
+        model = self.model
+        if isinstance(d, (Drop.Column, Drop.Constraint)) and table is None:
+            return False
+        if isinstance(d, Drop.Column):
+            column = model.column(table, d.name)
+            if column is None:
+                return False
+            return self.dropcolumn(table, column)
+        if isinstance(d, Drop.Constraint):
+            c = model.constraint(table, d.name)
+            if c is None:
+                return False
+            if c in table.constraints:
+                model.removeconstraint(table, c)
+                return True
+            for column in table.columns:
+                if c in column.modifiers:
+                    model.removemodifier(column, c)
+                    return True
+            return False
+        kind = {
+            Drop.Table:Table,
+            Drop.Index:Index,
+            Drop.Sequence:Sequence,
+            Drop.Synonym:Synonym,
+        }.get(d.__class__)
+        if kind is None:
+            return False
+        x = self.objects[kind].pop(key(d.name), None)
+        if x is None:
+            return False
+        model.remove(x)
+        if isinstance(x, Table):
+            self.droptable(x)
+        return True
+
+    def droptable(self, table):
+        model = self.model
+        for i in model.tableindexes(table.name):
+            self.dropindex(i)
+        for x in self.statements.pop(key(table.name), ()):
+            model.remove(x)
+
+    def dropindex(self, i):
+        indexes = self.objects[Index]
+        if indexes.get(key(i.name)) is i:
+            del indexes[key(i.name)]
+        self.model.remove(i)
+
+    def dropcolumn(self, table, column):
+        """
+        Drop the column, the constraints and indexes on it, and its
+        values and comments in the INSERT and COMMENT statements.
+        Not applied when an INSERT does not name its columns or
+        names only this one.
+        @return: True when applied.
+        @rtype: bool
+        """
+        model = self.model
+        k = key(column.name)
+        statements = self.statements.get(key(table.name), [])
+        for x in statements:
+            if not isinstance(x, Insert):
+                continue
+            if not x.columns or len(x.columns) != len(x.values):
+                return False
+            if self.keys(x.columns) == [k]:
+                return False
+        for c in table.constraints[:]:
+            if k in self.keys(self.columns(c)):
+                model.removeconstraint(table, c)
+        for i in model.tableindexes(table.name):
+            if k in self.keys(i.columns):
+                self.dropindex(i)
+        model.removecolumn(table, column)
+        for x in statements[:]:
+            if isinstance(x, Insert):
+                kept = []
+                for n, v in zip(x.columns, x.values):
+                    if isinstance(n, basestring) and key(n) == k:
+                        continue
+                    kept.append((n, v))
+                x.columns = [n for n, v in kept]
+                x.values = [v for n, v in kept]
+                continue
+            if isinstance(x, ColumnComment) and key(x.column) == k:
+                statements.remove(x)
+                model.remove(x)
+        return True
+
+    def renametable(self, table, name):
+        old = key(table.name)
+        self.model.renametable(table, name)
+        tables = self.objects[Table]
+        if tables.get(old) is table:
+            del tables[old]
+        tables[key(name)] = table
+        statements = self.statements.pop(old, [])
+        for x in statements:
+            x.table = name
+        self.statements.setdefault(key(name), []).extend(statements)
+
+    def renamecolumn(self, table, name, newname):
+        model = self.model
+        column = model.column(table, name)
+        if column is None:
+            return False
+        model.rename(table, column, newname)
+        k = key(name)
+        for c in table.constraints:
+            if isinstance(c, (PK, Unique)) and c.columns:
+                c.columns = self.renamed(c.columns, k, newname)
+            if isinstance(c, FK):
+                c.refA.columns = self.renamed(c.refA.columns, k, newname)
+        for c in table.constraints + table.columns:
+            for m in getattr(c, 'modifiers', ()):
+                if isinstance(m, FK) and m.refA is not None:
+                    m.refA.columns = self.renamed(m.refA.columns, k, newname)
+        for c in table.constraints + table.columns:
+            for m in [c] + list(getattr(c, 'modifiers', ())):
+                if isinstance(m, CkMod) and isinstance(m.expression, Expression):
+                    terms = m.expression.terms
+                    m.expression.terms = self.renamed(terms, k, newname)
+        for i in model.tableindexes(table.name):
+            i.columns = self.renamed(i.columns, k, newname)
+        for t, fk in model.referencing(table.name):
+            fk.refB.columns = self.renamed(fk.refB.columns, k, newname)
+        for x in self.statements.get(key(table.name), ()):
+            if isinstance(x, Insert) and x.columns:
+                x.columns = self.renamed(x.columns, k, newname)
+            if isinstance(x, ColumnComment) and key(x.column) == k:
+                x.column = newname
+        return True
+
+    def renamed(self, names, k, newname):
+        """ get the names with those matching the key (k) renamed """
+        result = []
+        for n in names:
+            if isinstance(n, basestring) and key(n) == k:
+                n = newname
+            result.append(n)
+        return result
+
+    def columns(self, c):
+        """ get the column names of a table constraint """
+        if isinstance(c, Column):
+            return [c.name]
+        if isinstance(c, FK):
+            return c.refA.columns
+        return getattr(c, 'columns', None) or ()
+
+    def keys(self, names):
+        return [key(n) for n in names if isinstance(n, basestring)]
+
+    def alterindex(self, alter):
+        index = self.objects[Index].get(key(alter.index))
+        if index is None:
+            return False
+        index.modifiers.extend(alter.mods)
+        return True
@@ -0,0 +1,300 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+from chameleon.model import *
+
+
+class Graph:
+    """
+    The dependency graph of the tables, indexes, sequences and
+    synonyms of a model.  A table depends on the tables referenced
+    by its FKs, an index on its table and a synonym on the object
+    it names.  Names are resolved within the model (see L{key});
+    references to objects not in the model are not dependencies.
+    FKs that form a cycle are deferred: removed from their tables
+    and added by ALTER TABLE statements after the tables.
+    @ivar model: The model.
+    @type model: L{Model}
+    @ivar nodes: The nodes (in content order).
+    @type nodes: list
+    @ivar depends: The dependencies: {node:[node,]}
+    @type depends: dict
+    @ivar fks: The FKs of each table: {table:[(referenced,fk,column),]}
+        The column is None for table constraints.
+    @type fks: dict
+    @ivar deferred: The ALTER TABLE statements of deferred FKs.
+    @type deferred: list
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.nodes = []
+        self.depends = {}
+        self.fks = {}
+        self.deferred = []
+        self.build()
+
+    def build(self):
+        tables = {}
+        named = {}
+        for c in self.model.content:
+            if isinstance(c, Table):
+                tables[key(c.name)] = c
+                named[key(c.name)] = c
+            elif isinstance(c, Sequence):
+                named[key(c.name)] = c
+            elif isinstance(c, Synonym):
+                named[key(c.synonym)] = c
+            elif not isinstance(c, Index):
+                continue
+            self.nodes.append(c)
+        for c in self.nodes:
+            depends = []
+            if isinstance(c, Table):
+                self.fks[c] = []
+                for fk, column in self.references(c):
+                    referenced = tables.get(key(fk.refB.table))
+                    if referenced is None or referenced is c:
+                        continue
+                    self.fks[c].append((referenced, fk, column))
+                    depends.append(referenced)
+            elif isinstance(c, Index):
+                table = tables.get(key(c.table))
+                if table is not None:
+                    depends.append(table)
+            elif isinstance(c, Synonym) and c.referenced is not None:
+                referenced = named.get(key(c.referenced))
+                if referenced is not None and referenced is not c:
+                    depends.append(referenced)
+            self.depends[c] = depends
+
+    def references(self, table):
+        """ get the FKs of the table: [(fk,column),] """
+        result = []
+        for c in table.constraints:
+            if isinstance(c, FK) and c.refB is not None:
+                result.append((c, None))
+        for column in table.columns:
+            for m in column.references():
+                if m.refB is not None:
+                    result.append((m, column))
+        return result
+
+    def order(self):
+        """
+        Order the model content by dependencies and group it into
+        waves; the statements in a wave do not depend on each other
+        and may be applied concurrently.  FK cycles are broken first.
+        Other statements (DROP, ALTER, INSERT, ...) keep their original
+        order: those that precede an object they affect (such as
+        DROP TABLE a before CREATE TABLE a) before the waves and the
+        rest after them.  Sets model.waves and model.content.
+        @return: The waves: [(label,[node,]),]
+        @rtype: list
+        """
+        self.breakcycles()
+        levels = self.levels()
+        waves = []
+        for node in self.nodes:
+            n = levels[node]
+            while len(waves) < n:
+                waves.append([])
+            waves[n-1].append(node)
+        result = []
+        for n, nodes in enumerate(waves):
+            result.append(('wave %d' % (n+1), nodes))
+        if self.deferred:
+            label = 'wave %d: deferred constraints' % (len(waves)+1)
+            result.append((label, self.deferred))
+        before, after = self.others()
+        if before:
+            result.insert(0, ('in order, before wave 1', before))
+        if after:
+            result.append(('in order', after))
+        content = Content()
+        for label, nodes in result:
+            content.extend(nodes)
+        self.model.content = content
+        self.model.waves = result
+        return result
+
+    def others(self):
+        """
+        Get the statements that are not ordered by dependencies,
+        split into those that precede (in content order) an object
+        they affect and the rest.
+        @return: ([before,], [after,])
+        @rtype: tuple
+        """
+        ordered = set(self.depends)
+        ordered.update(self.deferred)
+        last = {}
+        for n, c in enumerate(self.model.content):
+            if c in self.depends:
+                last[self.target(c)] = n
+        before = []
+        after = []
+        for n, c in enumerate(self.model.content):
+            if c in ordered:
+                continue
+            if last.get(self.target(c), -1) > n:
+                before.append(c)
+            else:
+                after.append(c)
+        return (before, after)
+
+    def target(self, c):
+        """
+        Get the (lookup) key of the table, index, sequence or
+        synonym that the statement creates or affects.  Indexes are
+        named apart from the other objects.
+        @return: (namespace,key) or None
+        @rtype: tuple
+        """
+        if isinstance(c, (Index, Drop.Index)):
+            return ('index', key(c.name))
+        if isinstance(c, Alter.Index):
+            return ('index', key(c.index))
+        if isinstance(c, Synonym):
+            return ('object', key(c.synonym))
+        if isinstance(c, (Table, Sequence, Drop.Table, Drop.Sequence, Drop.Synonym)):
+            return ('object', key(c.name))
+        if isinstance(c, Drop):
+            return self.target(c.object)
+        if isinstance(c, (Alter.Table, Insert, TableComment)):
+            return ('object', key(c.table))
+        if isinstance(c, Rename) and isinstance(c.object, Rename.Table):
+            return ('object', key(c.object.name))
+        return None
+
+    def levels(self):
+        """
+        Get the wave (1 based) of each node: one after the last
+        wave of its dependencies.  Dependencies on a node that is
+        being visited (a cycle not involving FKs) are ignored.
+        @return: {node:wave}
+        @rtype: dict
+        """
+        levels = {}
+        for root in self.nodes:
+            if root in levels:
+                continue
+            levels[root] = 0
+            stack = [(root, iter(self.depends[root]))]
+            while stack:
+                node, depends = stack[-1]
+                for d in depends:
+                    if d not in levels:
+                        levels[d] = 0
+                        stack.append((d, iter(self.depends[d])))
+                        break
+                else:
+                    stack.pop()
+                    n = [levels[d] for d in self.depends[node]]
+                    levels[node] = max(n + [0]) + 1
+        return levels
+
+    def breakcycles(self):
+        """
+        Defer the FKs between tables in the same strongly
+        connected component, in content order.
+        """
+        components = {}
+        for component in self.components():
+            if len(component) < 2:
+                continue
+            for table in component:
+                components[table] = component
+        for table in self.nodes:
+            component = components.get(table)
+            if component is None:
+                continue
+            kept = []
+            for referenced, fk, column in self.fks[table]:
+                if components.get(referenced) is component:
+                    self.defer(table, fk, column)
+                else:
+                    kept.append((referenced, fk, column))
+            self.fks[table] = kept
+            self.depends[table] = [r[0] for r in kept]
+
+    def defer(self, table, fk, column):
+        """
+        Remove the FK from the table and add an ALTER TABLE
+        statement that adds it.  Column FKs are replaced by the
+        equivalent table constraint.
+        """
+        model = self.model
+        if column is None:
+            model.removeconstraint(table, fk)
+        else:
+            model.removemodifier(column, fk)
+            name = fk.name
+            if name is None:
+                name = '%s_%s_fk' % (table.name, column.name)
+            constraint = FK(name)
+            constraint.refA = FK.Reference(table.name, [column.name])
+            constraint.refB = fk.refB
+            constraint.ondelete = fk.ondelete
+            fk = constraint
+        alter = Alter.Table(table.name, adds=[fk])
+        model.add(alter)
+        self.deferred.append(alter)
+
+    def components(self):
+        """
+        Get the strongly connected components of the tables
+        (Tarjan, iterative).
+        @return: A list of components (lists of tables).
+        @rtype: list
+        """
+        index = {}
+        lowlink = {}
+        stack = []
+        onstack = set()
+        result = []
+        for root in self.nodes:
+            if root not in self.fks or root in index:
+                continue
+            work = [(root, iter(self.fks[root]))]
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            onstack.add(root)
+            while work:
+                node, edges = work[-1]
+                for referenced, fk, column in edges:
+                    if referenced not in index:
+                        index[referenced] = lowlink[referenced] = len(index)
+                        stack.append(referenced)
+                        onstack.add(referenced)
+                        work.append((referenced, iter(self.fks[referenced])))
+                        break
+                    if referenced in onstack:
+                        lowlink[node] = min(lowlink[node], index[referenced])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            t = stack.pop()
+                            onstack.discard(t)
+                            component.append(t)
+                            if t is node:
+                                break
+                        result.append(component)
+        return result
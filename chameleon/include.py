@@ -0,0 +1,180 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+from chameleon.parser import Workers, parse, parallel, work
+from chameleon.model import Include
+import cPickle as pickle
+import os
+
+try:
+    from hashlib import md5
+except ImportError:
+    from md5 import new as md5
+
+
+class Resolver:
+    """
+    Resolves (@file and \\i file) includes by parsing the included
+    files and merging their content into the including script.
+    Included files are loaded breadth first; the files found at
+    each level are parsed together, using the worker processes when
+    (jobs) is specified.  Each file is parsed once per run: parsed
+    files are kept (pickled) by a digest of their content and each
+    use gets a fresh copy, so a file shared by several scripts (or
+    copied under another name) is parsed once.
+    A file included more than once by a script is merged at its
+    first include only.  An include cycle is an error.
+    Include names are relative to the directory of the including
+    file, then the current directory.  The (.sql) extension is
+    optional.
+    @ivar files: Loaded files: {path:(digest,[included path,])}
+    @type files: dict
+    @ivar parsed: Parsed files by content digest:
+        {digest:(pickled script,[include name,])}
+    @type parsed: dict
+    """
+
+    def __init__(self, optimized=0, lexer=None, jobs=None, cache=None):
+        self.optimized = optimized
+        self.lexer = lexer
+        self.jobs = jobs
+        self.cache = cache
+        self.files = {}
+        self.parsed = {}
+
+    def resolve(self, path):
+        """
+        Get the script (list of model objects) for the file with
+        all includes replaced by the content of the included files.
+        @param path: The path to the (top level) file.
+        @type path: str
+        @return: The merged script.
+        @rtype: list
+        """
+        path = os.path.abspath(path)
+        self.load([path])
+        script = []
+        self.merge(path, [], set(), script)
+        return script
+
+    def merge(self, path, chain, merged, script):
+        if path in chain:
+            cycle = ' -> '.join(chain[chain.index(path):]+[path])
+            raise Exception('include cycle: %s' % cycle)
+        if path in merged:
+            return
+        merged.add(path)
+        digest, included = self.files[path]
+        included = iter(included)
+        chain = chain+[path]
+        for x in pickle.loads(self.parsed[digest][0]):
+            if isinstance(x, Include):
+                self.merge(included.next(), chain, merged, script)
+            else:
+                script.append(x)
+
+    def load(self, paths):
+        """
+        Load the files and, level by level, the files they include
+        which have not already been loaded.
+        """
+        seen = set(paths)
+        level = list(paths)
+        while level:
+            self.read([p for p in level if p not in self.files])
+            found = []
+            for path in level:
+                for child in self.files[path][1]:
+                    if child not in seen:
+                        seen.add(child)
+                        found.append(child)
+            level = found
+
+    def read(self, paths):
+        """
+        Read the files, parse those with new content and
+        locate the files they include.
+        """
+        digests = []
+        contents = {}
+        for path in paths:
+            f = open(path)
+            try:
+                content = f.read()
+            finally:
+                f.close()
+            digest = md5(content).digest()
+            digests.append(digest)
+            if digest not in self.parsed:
+                contents[digest] = content
+        self.parse(contents)
+        loaded = {}
+        for path, digest in zip(paths, digests):
+            names = self.parsed[digest][1]
+            included = [self.locate(path, n) for n in names]
+            loaded[path] = (digest, included)
+        self.files.update(loaded)
+
+    def parse(self, contents):
+        """
+        Parse the file contents: {digest:content}.
+        When (jobs) is specified, the files are parsed concurrently
+        or, for a single file, its statements are.
+        """
+        if self.jobs is None:
+            for digest, content in contents.items():
+                script = parse(content, self.optimized, self.lexer, self.cache)
+                self.store(digest, script)
+            return
+        if len(contents) == 1:
+            for digest, content in contents.items():
+                script = parallel(
+                    content,
+                    self.optimized,
+                    self.lexer,
+                    self.jobs or None,
+                    self.cache)
+                self.store(digest, script)
+            return
+        digests = contents.keys()
+        batches = []
+        for index, digest in enumerate(digests):
+            statements = [(index, 1, contents[digest])]
+            batches.append((self.optimized, self.lexer, statements))
+        pool = Workers.get(self.jobs or None, self.optimized).pool
+        for parsed in pool.imap(work, batches):
+            for index, script in parsed:
+                self.store(digests[index], script)
+
+    def store(self, digest, script):
+        names = [x.name for x in script if isinstance(x, Include)]
+        pickled = pickle.dumps(script, pickle.HIGHEST_PROTOCOL)
+        self.parsed[digest] = (pickled, names)
+
+    def locate(self, parent, name):
+        """
+        Get the path to the file included by (parent) by (name).
+        """
+        name = name.strip().lstrip('@')
+        candidates = []
+        for dirname in (os.path.dirname(parent), os.getcwd()):
+            path = os.path.join(dirname, name)
+            candidates.append(path)
+            if not os.path.splitext(name)[1]:
+                candidates.append(path+'.sql')
+        for path in candidates:
+            if os.path.isfile(path):
+                return os.path.abspath(path)
+        raise Exception('include "%s" in "%s", not found' % (name, parent))
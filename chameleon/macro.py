@@ -0,0 +1,115 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+import os
+import re
+
+
+class Macros:
+    """
+    The macro values for an environment, loaded from a variables
+    file containing (name = value) lines.  Blank lines and lines
+    starting with (#) are ignored.  The environment is named by the
+    file name without the extension.
+    @ivar name: The environment name.
+    @type name: str
+    @ivar values: The macro values: {name:value}
+    @type values: dict
+    @ivar unresolved: Macros without a value: {name:count}
+    @type unresolved: dict
+    """
+
+    @classmethod
+    def load(cls, path):
+        values = {}
+        f = open(path)
+        try:
+            for n, line in enumerate(f):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                if '=' not in line:
+                    raise Exception(
+                        '%s:%d: "%s", not-valid' % (path, n+1, line))
+                name, value = line.split('=', 1)
+                values[name.strip()] = value.strip()
+        finally:
+            f.close()
+        name = os.path.splitext(os.path.basename(path))[0]
+        return cls(name, values)
+
+    def __init__(self, name, values):
+        self.name = name
+        self.values = values
+        self.unresolved = {}
+
+    def get(self, name, text=None):
+        """
+        Get the value of the macro.  Unresolved macros are
+        recorded and left in place.
+        @param name: The macro name.
+        @type name: str
+        @param text: The macro as written, returned when unresolved.
+        @type text: str
+        """
+        value = self.values.get(name)
+        if value is None:
+            self.unresolved[name] = self.unresolved.get(name, 0) + 1
+            if text is None:
+                text = '[[%s]]' % name
+            return text
+        return value
+
+    def report(self):
+        s = []
+        s.append('unresolved macros (%s):' % self.name)
+        for name in sorted(self.unresolved):
+            s.append('%*d: %s' % (4, self.unresolved[name], name))
+        return '\n'.join(s)
+
+
+class Template:
+    """
+    Rendered text with [[ name ]] macros.  The text is split at the
+    macros once, so it can be expanded for any number of
+    environments by joining the parts with the macro values.
+    @ivar parts: The text split at the macros.  The macros are at
+        the odd indexes as: (text,name) where the text is the macro
+        as written and the name is stripped.
+    @type parts: list
+    """
+
+    pattern = re.compile(r'(\[\[\s*(.+?)\s*\]\])')
+
+    def __init__(self, text):
+        split = self.pattern.split(text)
+        self.parts = []
+        for i in range(0, len(split), 3):
+            self.parts.append(split[i])
+            if i+1 < len(split):
+                self.parts.append((split[i+1], split[i+2]))
+
+    def expand(self, macros):
+        """
+        Get the text with the macros replaced by the values.
+        @param macros: The macro values.
+        @type macros: L{Macros}
+        @rtype: str
+        """
+        parts = self.parts[:]
+        for i in range(1, len(parts), 2):
+            text, name = parts[i]
+            parts[i] = macros.get(name, text)
+        return ''.join(parts)
@@ -13,10 +13,11 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
 
-from chameleon.parser import parse
-from chameleon.model import Model
-from chameleon.optimizer import *
-from getopt import getopt, GetoptError
+#
+# The parser, optimizers and plugins are imported when used so
+# that --help (and option errors) do not pay for loading them.
+#
+from getopt import getopt, gnu_getopt, GetoptError
 from datetime import datetime as dt
 import traceback as tb
 import sys
@@ -27,9 +28,9 @@ sys.path.append('.')
 options = {}
 
 optimizers = {
-    'none' : Optimizer(options),
-    'basic' : Basic(options),
-    'best' : BestPractices(options),
+    'none' : 'Optimizer',
+    'basic' : 'Basic',
+    'best' : 'BestPractices',
 }
 
 verbose = ( lambda : options.get('verbose', False) )
@@ -38,9 +39,9 @@ output = None
 
 def main(argv):
     output = None
-    style = 'oracle'
-    optimizer = optimizers.get('none')              
-    flags = 'vhfDSo:s:H:O:'
+    styles = ['oracle']
+    optimizer = 'none'
+    flags = 'vhfDSo:s:H:O:j:'
     keywords = [
         'help',
         'verbose',
@@ -51,9 +52,27 @@ def main(argv):
         'fast',
         'deferrable',
         'sort',
+        'waves',
+        'lexer=',
+        'stream',
+        'jobs=',
+        'cache',
+        'cache-size=',
+        'max-errors=',
+        'includes',
+        'macros=',
+        'profile=',
+        'snapshot=',
+        'fold',
     ]
-    try:                   
-        opts, args = getopt(argv, flags, keywords)
+    if argv[:1] == ['diff']:
+        options['diff'] = True
+        argv = argv[1:]
+    try:
+        if options.get('diff'):
+            opts, args = gnu_getopt(argv, flags, keywords)
+        else:
+            opts, args = getopt(argv, flags, keywords)
         for opt, arg in opts:
             if opt in ('-h', '--help'):
                 usage()
@@ -65,10 +84,10 @@ def main(argv):
                 output = arg
                 continue
             if opt in ('-s', '--style'):
-                if style in ('oracle', 'postgres'):
-                    style = arg
-                else:
-                    raise GetoptError('style "%s, not-valid' % arg)
+                styles = arg.split(',')
+                for style in styles:
+                    if style not in ('oracle', 'postgres'):
+                        raise GetoptError('style "%s", not-valid' % style)
                 continue
             if opt in ('-f', '--fast'):
                 options['fast'] = 1
@@ -76,10 +95,65 @@ def main(argv):
             if opt in ('-S', '--sort'):
                 options['sort'] = True
                 continue
+            if opt == '--waves':
+                options['waves'] = True
+                continue
+            if opt == '--lexer':
+                from chameleon.parser import Parser
+                if arg not in Parser.lexers:
+                    raise GetoptError('lexer "%s", not-valid' % arg)
+                options['lexer'] = arg
+                continue
+            if opt == '--stream':
+                options['stream'] = True
+                continue
+            if opt in ('-j', '--jobs'):
+                try:
+                    options['jobs'] = int(arg)
+                except ValueError:
+                    raise GetoptError('jobs "%s", not-valid' % arg)
+                continue
+            if opt == '--cache':
+                options['cache'] = True
+                continue
+            if opt == '--fold':
+                options['fold'] = True
+                continue
+            if opt == '--snapshot':
+                options['snapshot'] = arg
+                continue
+            if opt == '--includes':
+                options['includes'] = True
+                continue
+            if opt == '--macros':
+                from chameleon.macro import Macros
+                try:
+                    macros = Macros.load(arg)
+                except Exception, e:
+                    raise GetoptError('macros "%s", %s' % (arg, e))
+                options.setdefault('macros', []).append(macros)
+                continue
+            if opt == '--profile':
+                if arg not in ('table', 'json'):
+                    raise GetoptError('profile "%s", not-valid' % arg)
+                options['profile'] = arg
+                continue
+            if opt == '--cache-size':
+                try:
+                    options['cache-size'] = int(arg)
+                except ValueError:
+                    raise GetoptError('cache size "%s", not-valid' % arg)
+                continue
+            if opt == '--max-errors':
+                try:
+                    options['max-errors'] = int(arg)
+                except ValueError:
+                    raise GetoptError('max errors "%s", not-valid' % arg)
+                continue
             if opt in ('-O', '--optimizer'):
-                optimizer = optimizers.get(arg)
-                if optimizer is None:
+                if arg not in optimizers:
                     raise GetoptError('optimizer "%s", not-valid' % arg)
+                optimizer = arg
                 continue
             if opt in ('-H', '--header'):
                 f = open(arg)
@@ -89,58 +163,185 @@ def main(argv):
             if opt in ('-D', '--deferrable'):
                 options['deferrable'] = True
                 continue
-        options['optimizer'] = optimizer
-        processfiles(style, output, args)
+        options['optimizer'] = getoptimizer(optimizer)
+        if 'max-errors' in options:
+            from chameleon.parser import Parser
+            Parser.maxerrors = options['max-errors']
+        if options.get('profile'):
+            if options.get('jobs') is not None:
+                raise GetoptError('--profile with --jobs, not-valid')
+            from chameleon.parser import Parser, Profile
+            Parser.profile = Profile()
+        if options.get('cache'):
+            options['cache'] = getcache(options.get('cache-size', 64))
+        if options.get('includes'):
+            if options.get('stream'):
+                raise GetoptError('--includes and --stream, not-valid together')
+            from chameleon.include import Resolver
+            options['includes'] = Resolver(
+                options.get('fast', 0),
+                options.get('lexer'),
+                options.get('jobs'),
+                options.get('cache'))
+        if options.get('stream') and len(styles) > 1:
+            raise GetoptError('--stream with multiple styles, not-valid')
+        if options.get('stream') and len(options.get('macros', ())) > 1:
+            raise GetoptError('--stream with multiple --macros, not-valid')
+        if options.get('snapshot'):
+            if options.get('stream'):
+                raise GetoptError('--snapshot and --stream, not-valid together')
+            if len(args) != 1 and not options.get('fold'):
+                raise GetoptError('--snapshot with %d files, not-valid' % len(args))
+        if options.get('fold'):
+            if options.get('stream'):
+                raise GetoptError('--fold and --stream, not-valid together')
+            if output and os.path.isdir(output):
+                raise GetoptError('--fold with output directory, not-valid')
+        if options.get('diff'):
+            if len(args) != 2:
+                raise GetoptError('diff with %d files, not-valid' % len(args))
+            for opt in ('stream', 'fold', 'snapshot', 'waves'):
+                if options.get(opt):
+                    raise GetoptError('diff with --%s, not-valid' % opt)
+            if output and os.path.isdir(output):
+                raise GetoptError('diff with output directory, not-valid')
+        if options.get('waves'):
+            if options.get('stream'):
+                raise GetoptError('--waves and --stream, not-valid together')
+            if options.get('sort'):
+                raise GetoptError('--waves and --sort, not-valid together')
+        processfiles(styles, output, args)
     except GetoptError, e:
         print e
         usage()
         sys.exit(2)
         
-def processfiles(style, output, files):
-        plugin = getplugin(style)
-        plugin.factory.options = options
+def processfiles(styles, output, files):
+        plugins = [getplugin(style) for style in styles]
+        for plugin in plugins:
+            plugin.factory.options = options
         failed = []
-        if output is None:
-            data, fp = process(plugin, files)
+        if options.get('diff'):
+            failed += difffiles(styles, plugins, output, files)
+        elif options.get('stream'):
+            failed += streamfiles(plugins[0], output, files)
+        elif output is None:
+            datas, fp = process(plugins, files)
             failed += fp
-            print data
+            for style, env, data in outputs(styles, datas):
+                if style:
+                    print '-- style: %s' % style
+                if env:
+                    print '-- environment: %s' % env
+                print data
         else:
             if os.path.isdir(output):
                 for fn in files:
-                    data, fp = process(plugin, (fn,))
+                    datas, fp = process(plugins, (fn,))
                     failed += fp
                     if len(fp):
                         continue
-                    ofn = os.path.join(output, os.path.basename(fn))
-                    if verbose():
-                        print 'writing:\n\t%s\nto:\n\t%s' % (fn, ofn)
-                    f = open(ofn, 'w')
-                    f.write(data)
-                    f.close()
+                    for style, env, data in outputs(styles, datas):
+                        ofn = os.path.join(output, style or '', env or '')
+                        if not os.path.isdir(ofn):
+                            os.makedirs(ofn)
+                        ofn = os.path.join(ofn, os.path.basename(fn))
+                        if verbose():
+                            print 'writing:\n\t%s\nto:\n\t%s' % (fn, ofn)
+                        f = open(ofn, 'w')
+                        f.write(data)
+                        f.close()
             else:
-                for fn in files:
-                    data, fp = process(plugin, files)
-                    failed += fp
+                datas, fp = process(plugins, files)
+                failed += fp
+                for style, env, data in outputs(styles, datas):
+                    ofn = outputfile(output, style, env)
                     if verbose():
-                        print 'writing:\n\t%s\nto:\n\t%s' % (fn, output)
-                    f = open(output, 'w')
+                        for fn in files:
+                            print 'writing:\n\t%s\nto:\n\t%s' % (fn, ofn)
+                    f = open(ofn, 'w')
                     f.write(data)
                     f.close()
         errno = len(failed)
-        processed = len(files)
+        if options.get('diff'):
+            processed = len(files)
+        else:
+            processed = len(units(files))
         optimizer = options.get('optimizer')
+        cache = options.get('cache')
+        if cache:
+            cache.save()
         s = []
         s.append('(succeeded: %d' % (processed-errno))
         s.append('failed: %d' % errno)
         s.append('warnings: %d)' % len(optimizer.warnings))
         print ', '.join(s)
+        for macros in options.get('macros', ()):
+            if macros.unresolved:
+                print macros.report()
+        if options.get('profile'):
+            from chameleon.parser import Parser
+            if options['profile'] == 'json':
+                print Parser.profile.json()
+            else:
+                print Parser.profile.report()
         if verbose():
             print optimizer.report()
+            if cache:
+                print cache.report()
         if errno:
             for fd in failed:
                 print '  %s\n    (%s)' % fd
         sys.exit(errno)    
        
+def outputs(styles, datas):
+    """
+    Expand the data rendered for each style (--style) for each
+    environment (see L{expand}).  Yields (style, environment, data).
+    The style is None unless there are several.
+    """
+    for style, data in zip(styles, datas):
+        if len(styles) == 1:
+            style = None
+        for env, expanded in expand(data):
+            yield (style, env, expanded)
+
+def outputfile(output, style, env):
+    """ get the output file name: <file>[.<style>][.<env>].<ext> """
+    root, ext = os.path.splitext(output)
+    for part in (style, env):
+        if part:
+            root = '%s.%s' % (root, part)
+    return root + ext
+
+def expand(data):
+    """
+    Expand the macros in the rendered data for each environment
+    (--macros).  Yields (environment, data).  The environment is
+    None unless there are several.
+    """
+    environments = options.get('macros')
+    if not environments:
+        yield (None, data)
+        return
+    from chameleon.macro import Template
+    template = Template(data)
+    if len(environments) == 1:
+        yield (None, template.expand(environments[0]))
+        return
+    for macros in environments:
+        yield (macros.name, template.expand(macros))
+       
+def getoptimizer(name):
+    from chameleon import optimizer
+    return getattr(optimizer, optimizers[name])(options)
+       
+def getcache(size):
+    from chameleon.parser import Tables
+    from chameleon.cache import Cache
+    tables = Tables()
+    return Cache(tables.cachedir(), tables.models(), size*1024*1024)
+       
 def getplugin(style):
     if style == 'oracle':
         from chameleon.oracle import Model as Oracle
@@ -150,33 +351,269 @@ def getplugin(style):
         return Postgres()
     raise GetoptError('output style "%s" not supported' % style)
         
-def process(plugin, files):
-    data = []
+def units(files):
+    """
+    Get the units of files processed together.  With --fold, all
+    of the files are one unit; otherwise, each file is a unit.
+    @rtype: list
+    """
+    if options.get('fold'):
+        return [tuple(files)]
+    return [(fn,) for fn in files]
+
+def process(plugins, files):
+    """
+    Parse, optimize and render the files for each plugin (style).
+    @return: ([data,], failed) with the data rendered by each plugin.
+    @rtype: tuple
+    """
+    from chameleon.model import Model
+    from chameleon.snapshot import Snapshot
+    datas = [[] for plugin in plugins]
     failed = []
     header = options.get('header', '')
-    fast = options.get('fast', 0)
     optimizer = options.get('optimizer')
+    for unit in units(files):
+        fn = ', '.join(unit)
+        try:
+            if len(unit) == 1 and Snapshot.test(fn):
+                model = loadsnapshot(fn, optimizer)
+            else:
+                script = []
+                for fn in unit:
+                    script += loadfile(fn)
+                fn = ', '.join(unit)
+                n = len(optimizer.warnings)
+                model = Model(script)
+                if options.get('fold'):
+                    from chameleon.fold import Folder
+                    Folder(model).fold()
+                model = optimizer.process(model)
+                if options.get('snapshot'):
+                    snapshot = Snapshot(
+                        model.content,
+                        optimizer.__class__.__name__,
+                        optimizer.exported(n))
+                    snapshot.save(options['snapshot'])
+            if options.get('waves'):
+                from chameleon.graph import Graph
+                Graph(model).order()
+            for data, rendered in zip(datas, render(plugins, model)):
+                data.append(header)
+                data.append('\n')
+                data.append(rendered)
+                data.append('\n')
+        except Exception, e:
+            tb.print_exc()
+            failed.append((fn, e))
+    datas = ['\n'.join(data) for data in datas]
+    return (datas, failed)
+
+def render(plugins, model):
+    """
+    Render the model by each plugin.  With several plugins, each
+    renders in a (forked) worker process that shares the model
+    (copy on write) with this process, so the model is parsed and
+    optimized once and cannot be changed by the renderers.
+    @return: The data rendered by each plugin.
+    @rtype: list
+    """
+    if len(plugins) == 1:
+        return [plugins[0].render(model)]
+    import multiprocessing
+    workers = []
+    for plugin in plugins:
+        reader, writer = multiprocessing.Pipe(False)
+        worker = multiprocessing.Process(
+            target=renderer,
+            args=(plugin, model, writer))
+        worker.start()
+        writer.close()
+        workers.append((worker, reader))
+    result = []
+    for worker, reader in workers:
+        try:
+            ok, data = reader.recv()
+        except EOFError:
+            ok, data = (False, 'renderer exited')
+        worker.join()
+        if not ok:
+            raise Exception(data)
+        result.append(data)
+    return result
+
+def renderer(plugin, model, writer):
+    """ render the model and send the data (in a worker process) """
+    import gc
+    gc.disable()
+    try:
+        writer.send((True, plugin.render(model)))
+    except Exception:
+        writer.send((False, tb.format_exc()))
+    writer.close()
+
+def loadsnapshot(fn, optimizer):
+    """
+    Load the model from a snapshot.  The warnings reported when it
+    was optimized are restored.  A snapshot that was not optimized
+    is optimized by the (specified) optimizer.
+    """
+    from chameleon.model import Model
+    from chameleon.snapshot import Snapshot
+    snapshot = Snapshot.load(fn)
+    optimizer.restore(snapshot.warnings)
+    model = Model(snapshot.content)
+    if snapshot.optimizer == 'Optimizer':
+        model = optimizer.process(model)
+    return model
+
+def difffiles(styles, plugins, output, files):
+    """
+    Write the statements that change the schema of the (old) file
+    into that of the (new) file.  Each is folded and optimized
+    first so that upgrade histories compare as the final schema.
+    The changes that cannot be expressed are always reported (as
+    comments): the statements do not apply them.
+    """
+    from chameleon.model import Model
+    from chameleon.fold import Folder
+    from chameleon.diff import Differ
+    failed = []
+    header = options.get('header', '')
+    optimizer = options.get('optimizer')
+    models = []
     for fn in files:
         try:
-            f = open(fn)
-            script = parse(f.read(), fast)
-            model = Model(script)
-            model = optimizer.process(model)
-            rendered = plugin.render(model)
-            data.append(header)
-            data.append('\n')
-            data.append(rendered)
-            data.append('\n')
+            model = Model(loadfile(fn))
+            Folder(model).fold()
+            models.append(optimizer.process(model))
         except Exception, e:
             tb.print_exc()
             failed.append((fn, e))
-    data = '\n'.join(data)
-    return (data, failed)
+    if failed:
+        return failed
+    differ = Differ(*models)
+    datas = []
+    for rendered in render(plugins, differ.diff()):
+        datas.append('\n'.join((header, rendered, '')))
+    if verbose():
+        print differ.report()
+    else:
+        for x in differ.skipped:
+            print '-- skipped: %s' % x
+    for style, env, data in outputs(styles, datas):
+        if output is None:
+            if style:
+                print '-- style: %s' % style
+            if env:
+                print '-- environment: %s' % env
+            print data
+            continue
+        ofn = outputfile(output, style, env)
+        if verbose():
+            print 'writing:\n\t%s\nto:\n\t%s' % (' -> '.join(files), ofn)
+        f = open(ofn, 'w')
+        f.write(data)
+        f.close()
+    return failed
+
+def loadfile(fn):
+    """ get the content (statements) of a script or snapshot """
+    from chameleon.snapshot import Snapshot
+    if Snapshot.test(fn):
+        return Snapshot.load(fn).content
+    resolver = options.get('includes')
+    if resolver:
+        return resolver.resolve(fn)
+    return parsefile(
+        fn,
+        options.get('fast', 0),
+        options.get('lexer'),
+        options.get('jobs'),
+        options.get('cache'))
+
+def parsefile(fn, fast, lexer, jobs, cache):
+    from chameleon.parser import mapped, parse, parallel
+    f = open(fn)
+    try:
+        input = mapped(f)
+        try:
+            if jobs is None:
+                return parse(input, fast, lexer, cache)
+            else:
+                return parallel(input, fast, lexer, jobs or None, cache)
+        finally:
+            if not isinstance(input, basestring):
+                input.close()
+    finally:
+        f.close()
+
+
+def streamfiles(plugin, output, files):
+    failed = []
+    if output is None:
+        for fn in files:
+            failed += streamfile(plugin, fn, sys.stdout)
+        print
+        return failed
+    if os.path.isdir(output):
+        for fn in files:
+            ofn = os.path.join(output, os.path.basename(fn))
+            if verbose():
+                print 'writing:\n\t%s\nto:\n\t%s' % (fn, ofn)
+            f = open(ofn, 'w')
+            failed += streamfile(plugin, fn, f)
+            f.close()
+        return failed
+    f = open(output, 'w')
+    for fn in files:
+        if verbose():
+            print 'writing:\n\t%s\nto:\n\t%s' % (fn, output)
+        failed += streamfile(plugin, fn, f)
+    f.close()
+    return failed
+
+def streamfile(plugin, fn, out):
+    """
+    Parse, optimize and render the script one statement at a time,
+    writing the output as it goes.  The optimizer only sees one
+    statement at a time.  A file name of (-) is stdin.
+    """
+    from chameleon.parser import stream
+    from chameleon.model import Model
+    failed = []
+    header = options.get('header', '')
+    fast = options.get('fast', 0)
+    lexer = options.get('lexer')
+    cache = options.get('cache')
+    optimizer = options.get('optimizer')
+    try:
+        if fn == '-':
+            f = sys.stdin
+        else:
+            f = open(fn)
+        out.write(header)
+        out.write('\n\n\n')
+        separator = ''
+        for x in stream(f, fast, lexer, cache):
+            model = optimizer.process(Model([x]))
+            if not model.content:
+                continue
+            out.write(separator)
+            for env, data in expand(plugin.render(model)):
+                out.write(data)
+            separator = '\n\n'
+        out.write('\n\n')
+    except Exception, e:
+        tb.print_exc()
+        failed.append((fn, e))
+    return failed
 
    
 def usage():
     s = []
     s.append('Usage chameleon: [OPTION]... [INPUT]')
+    s.append('       chameleon diff [OPTION]... OLD NEW')
     s.append(' Options:')
     s.append('  -h, --help')
     s.append('      Show usage information.')
@@ -186,6 +623,9 @@ def usage():
     s.append('      The output (file|directory).')
     s.append('  -s, --style')
     s.append('      The output style (oracle|postres ).')
+    s.append('      Several (comma separated) styles are rendered from one')
+    s.append('      parse, concurrently, and written to: <dir>/<style>/<file>')
+    s.append('      or <file>.<style>.<ext>.')
     s.append('        Default: oracle.')
     s.append('  -f, --fast')
     s.append('      The (fast) flag')
@@ -193,6 +633,61 @@ def usage():
     s.append('      The syntax optimizer to be used (none|basic|best).')
     s.append('  -H, --header')
     s.append('      The path to header file to prepend.')
+    s.append('  --lexer')
+    s.append('      The lexer engine (scanner|ply).')
+    s.append('        Default: scanner.')
+    s.append('  -j, --jobs')
+    s.append('      Parse each script using (n) worker processes.')
+    s.append('        0 = one per CPU.')
+    s.append('  --cache')
+    s.append('      Cache parsed statements so that only new or changed')
+    s.append('      statements are parsed on the next run.')
+    s.append('  --cache-size')
+    s.append('      The statement cache size limit (MB).')
+    s.append('        Default: 64.')
+    s.append('  --max-errors')
+    s.append('      The number of unexpected character errors after which')
+    s.append('      parsing is aborted.')
+    s.append('        Default: 100.')
+    s.append('  --includes')
+    s.append('      Parse (@file|\\i file) included files and merge their')
+    s.append('      content in place of the include.')
+    s.append('  --macros')
+    s.append('      A variables file of (name = value) lines used to expand')
+    s.append('      [[ name ]] macros.  When specified more than once, the')
+    s.append('      output is written for each environment (variables file):')
+    s.append('      <dir>/<env>/<file> or <file>.<env>.<ext>.')
+    s.append('  --profile')
+    s.append('      Profile the parser and report the calls and time of')
+    s.append('      each grammar rule and the count of each token type')
+    s.append('      as a (table|json).')
+    s.append('  --fold')
+    s.append('      Fold the input files (an upgrade history, in order) into')
+    s.append('      one script: the changes made by ALTER, DROP, RENAME and')
+    s.append('      MODIFY are applied to the tables, indexes and sequences')
+    s.append('      they change.')
+    s.append('  --snapshot')
+    s.append('      Save the parsed and optimized model of the (single) input')
+    s.append('      file to a snapshot file.  A snapshot given as input is')
+    s.append('      loaded instead of parsed; it is optimized only when it')
+    s.append('      was saved without an optimizer.')
+    s.append('  --waves')
+    s.append('      Order the statements by dependencies (FKs, indexes and')
+    s.append('      synonyms) in numbered waves.  The statements in a wave')
+    s.append('      do not depend on each other.  FK cycles are broken by')
+    s.append('      adding the FKs with ALTER TABLE after the tables.')
+    s.append('      Other statements keep their order: before the waves when')
+    s.append('      they precede an object they affect (DROP TABLE a before')
+    s.append('      CREATE TABLE a), otherwise after them.')
+    s.append('  diff')
+    s.append('      Write the ALTER, CREATE and DROP statements that change')
+    s.append('      the (OLD) schema into the (NEW) schema.  Renamed tables')
+    s.append('      and columns are detected by their structure and renamed.')
+    s.append('      Changes that cannot be applied (dropping an anonymous')
+    s.append('      constraint, ...) are listed as skipped.')
+    s.append('  --stream')
+    s.append('      Parse, optimize and write one statement at a time.')
+    s.append('      The optimizer only sees one statement at a time.')
     s.append('  Postgres Specific:')
     s.append('  -D, --deferrable')
     s.append('      Makes postgres FK constraints DEFERRABLE.')
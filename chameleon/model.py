@@ -13,32 +13,428 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
 
+import sys
+import copy_reg
+
+
 class Model(object):
+    """
+    The model of a script: the content (statements) and indexes.
+    Lookups by name are case-insensitive (see L{key}).  The indexes
+    are kept consistent by the methods used to change the model
+    (L{add}, L{remove}, L{addconstraint}, ...) so changes should be
+    made through them.  The indexes of table content and the FK
+    references are built when first used.
+    @ivar content: The statements.
+    @type content: L{Content}
+    @ivar tables: Tables by name.
+    @type tables: dict
+    @ivar indexes: Indexes by name.
+    @type indexes: dict
+    @ivar sequences: Sequences by name.
+    @type sequences: dict
+    @ivar bytable: Indexes by table name.
+    @type bytable: L{Names}
+    @ivar tablenames: The columns and constraints of tables
+        by name: {table:(columns,constraints)}
+    @type tablenames: dict
+    @ivar references: The FKs by referenced table name:
+        {key:[(table,fk),]}
+    @type references: dict
+    @ivar waves: The content grouped into deployment waves when
+        ordered by dependencies: [(label,[node,]),]
+        (see L{chameleon.graph.Graph.order}).
+    @type waves: list
+    """
     
     def __init__(self, content):
-        self.content = content
+        self.content = Content(content)
         self.tables = {}
         self.indexes = {}
         self.sequences = {}
-        self.synonyms = []
-        self.extra = []
+        self.synonyms = Content()
+        self.extra = Content()
+        self.bytable = Names('table')
+        self.tablenames = {}
+        self.references = None
+        self.waves = None
         for c in content:
-            if isinstance(c, Table):
-                self.tables[c.name] = c
-                continue
-            if isinstance(c, Index):
-                self.indexes[c.name] = c
-                continue
-            if isinstance(c, Sequence):
-                self.sequences[c.name] = c
-                continue
-            if isinstance(c, Synonym):
-                self.synonyms.append(c)
-                continue
-            self.extra.append(c)
-
-
-class Object(object):
+            self.classify(c)
+
+    def classify(self, c):
+        if isinstance(c, Table):
+            self.tables[c.name] = c
+            self.link(c)
+            return
+        if isinstance(c, Index):
+            self.indexes[c.name] = c
+            self.bytable.add(c)
+            return
+        if isinstance(c, Sequence):
+            self.sequences[c.name] = c
+            return
+        if isinstance(c, Synonym):
+            self.synonyms.append(c)
+            return
+        self.extra.append(c)
+
+    def unclassify(self, c):
+        if isinstance(c, Table):
+            if self.tables.get(c.name) is c:
+                del self.tables[c.name]
+            self.unlink(c)
+            self.tablenames.pop(c, None)
+            return
+        if isinstance(c, Index):
+            if self.indexes.get(c.name) is c:
+                del self.indexes[c.name]
+            self.bytable.remove(c)
+            return
+        if isinstance(c, Sequence):
+            if self.sequences.get(c.name) is c:
+                del self.sequences[c.name]
+            return
+        if isinstance(c, Synonym):
+            self.synonyms.remove(c)
+            return
+        self.extra.remove(c)
+
+    def add(self, c):
+        """ add a statement """
+        self.content.append(c)
+        self.classify(c)
+
+    def remove(self, c):
+        """ remove a statement """
+        self.content.remove(c)
+        self.unclassify(c)
+
+    def column(self, table, name):
+        """ get the column of the table by name """
+        return self.names(table)[0].get(name)
+
+    def constraint(self, table, name):
+        """ get the (table or column) constraint of the table by name """
+        return self.names(table)[1].get(name)
+
+    def tableindexes(self, name):
+        """ get the indexes on the table by table name """
+        return self.bytable.find(name)
+
+    def referencing(self, name):
+        """
+        Get the FKs that reference the table by table name.
+        @return: A list of: (table, fk)
+        @rtype: list
+        """
+        if self.references is None:
+            self.references = {}
+            for t in self.tables.values():
+                self.link(t)
+        return self.references.get(key(name), [])
+
+    def addconstraint(self, table, c):
+        """ add a (table) constraint; added columns are also accepted """
+        table.constraints.append(c)
+        self.added(table, c)
+
+    def removeconstraint(self, table, c):
+        table.constraints.remove(c)
+        self.removed(table, c)
+
+    def addmodifier(self, column, m):
+        """ add a column modifier """
+        column.modifiers.append(m)
+        self.added(column.table, m)
+
+    def removemodifier(self, column, m):
+        column.modifiers.remove(m)
+        self.removed(column.table, m)
+
+    def addcolumn(self, table, column):
+        column.table = table
+        table.columns.append(column)
+        self.added(table, column)
+
+    def removecolumn(self, table, column):
+        table.columns.remove(column)
+        self.removed(table, column)
+
+    def renametable(self, table, name):
+        """
+        Rename a table.  The FKs that reference the table and the
+        indexes on it are changed to the new name.
+        """
+        referencing = self.referencing(table.name)[:]
+        self.unlink(table)
+        for t, fk in referencing:
+            if t is not table:
+                self.unreference(t, fk)
+            fk.refB.table = name
+            if t is not table:
+                self.reference(t, fk)
+        for i in self.tableindexes(table.name):
+            self.bytable.remove(i)
+            i.table = name
+            self.bytable.add(i)
+        if self.tables.get(table.name) is table:
+            del self.tables[table.name]
+        table.name = name
+        self.tables[name] = table
+        self.link(table)
+
+    def rename(self, table, c, name):
+        """ rename a column or constraint of the table """
+        self.removed(table, c)
+        c.name = name
+        self.added(table, c)
+
+    def names(self, table):
+        """
+        Get the indexes of the columns and constraints of the table.
+        @return: (columns, constraints)
+        @rtype: tuple
+        """
+        names = self.tablenames.get(table)
+        if names is None:
+            names = (Names(), Names())
+            self.tablenames[table] = names
+            for c in table.columns:
+                self.added(table, c, fk=False)
+            for c in table.constraints:
+                self.added(table, c, fk=False)
+        return names
+
+    def added(self, table, c, fk=True):
+        if table is None:
+            return
+        names = self.tablenames.get(table)
+        if isinstance(c, Column):
+            if names is not None:
+                names[0].add(c)
+            for m in c.modifiers:
+                self.added(table, m, fk)
+            return
+        if names is not None and isinstance(c, Constraint):
+            names[1].add(c)
+        if fk and isinstance(c, FK) and self.references is not None:
+            if self.tables.get(table.name) is table:
+                self.reference(table, c)
+
+    def removed(self, table, c):
+        if table is None:
+            return
+        names = self.tablenames.get(table)
+        if isinstance(c, Column):
+            if names is not None:
+                names[0].remove(c)
+            for m in c.modifiers:
+                self.removed(table, m)
+            return
+        if names is not None and isinstance(c, Constraint):
+            names[1].remove(c)
+        if isinstance(c, FK) and self.references is not None:
+            self.unreference(table, c)
+
+    def link(self, table):
+        """ add the FK references of the table """
+        if self.references is None:
+            return
+        for fk in self.fks(table):
+            self.reference(table, fk)
+
+    def unlink(self, table):
+        """ remove the FK references of the table """
+        if self.references is None:
+            return
+        for fk in self.fks(table):
+            self.unreference(table, fk)
+
+    def fks(self, table):
+        """ get the FKs of the table (columns and constraints) """
+        for c in table.columns + table.constraints:
+            if isinstance(c, Column):
+                for m in c.references():
+                    yield m
+            elif isinstance(c, FK):
+                yield c
+
+    def reference(self, table, fk):
+        if fk.refB is None:
+            return
+        k = key(fk.refB.table)
+        self.references.setdefault(k, []).append((table, fk))
+
+    def unreference(self, table, fk):
+        if fk.refB is None:
+            return
+        k = key(fk.refB.table)
+        refs = self.references.get(k, [])
+        for i, ref in enumerate(refs):
+            if ref[1] is fk:
+                del refs[i]
+                break
+        if not refs:
+            self.references.pop(k, None)
+
+
+class Content(object):
+    """
+    An ordered collection of (distinct) nodes that iterates like a
+    list.  The nodes are doubly linked by identity so that a node is
+    removed, or inserted next to another node, in constant time.
+    Reordering is a remove followed by an insert.
+    @ivar nodes: The nodes: {id:node}
+    @type nodes: dict
+    @ivar links: The links: {id:[previous id, next id]}.  The
+        (None) link is the head: [last id, first id].
+    @type links: dict
+    """
+
+    def __init__(self, nodes=()):
+        self.nodes = {}
+        self.links = {None:[None, None]}
+        for node in nodes:
+            self.append(node)
+
+    def append(self, node):
+        self.link(node, None)
+
+    def extend(self, nodes):
+        for node in nodes:
+            self.append(node)
+
+    def insert(self, node, before=None, after=None):
+        """
+        Insert a node before or after another node.
+        When neither is specified, the node is appended.
+        """
+        if after is not None:
+            self.link(node, self.links[self.find(after)][1])
+        else:
+            self.link(node, self.find(before))
+
+    def remove(self, node):
+        k = self.find(node)
+        prev, next = self.links.pop(k)
+        self.links[prev][1] = next
+        self.links[next][0] = prev
+        del self.nodes[k]
+
+    def link(self, node, next):
+        """ link the node before the node with id (next) """
+        k = id(node)
+        if k in self.nodes:
+            raise ValueError('node already in content')
+        prev = self.links[next][0]
+        self.links[k] = [prev, next]
+        self.links[prev][1] = k
+        self.links[next][0] = k
+        self.nodes[k] = node
+
+    def find(self, node):
+        """ get the id of the node, None is the head """
+        if node is None:
+            return None
+        k = id(node)
+        if k not in self.nodes:
+            raise ValueError('node not in content')
+        return k
+
+    def __contains__(self, node):
+        return ( id(node) in self.nodes )
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __iter__(self):
+        return iter(self.list())
+
+    def __getitem__(self, index):
+        return self.list()[index]
+
+    def list(self):
+        """ get the nodes (in order) as a list """
+        result = []
+        nodes = self.nodes
+        links = self.links
+        k = links[None][1]
+        while k is not None:
+            result.append(nodes[k])
+            k = links[k][1]
+        return result
+
+
+class Names(object):
+    """
+    A case-insensitive index of nodes by name (or another field).
+    Nodes with the same name are kept in the order added and
+    the first is found.
+    @ivar field: The name of the indexed field.
+    @type field: str
+    @ivar nodes: The indexed nodes: {key:[node,]}
+    @type nodes: dict
+    """
+
+    def __init__(self, field='name'):
+        self.field = field
+        self.nodes = {}
+
+    def get(self, name):
+        found = self.nodes.get(key(name))
+        if found:
+            return found[0]
+        return None
+
+    def find(self, name):
+        return list(self.nodes.get(key(name), ()))
+
+    def add(self, node):
+        name = getattr(node, self.field)
+        if name is None:
+            return
+        self.nodes.setdefault(key(name), []).append(node)
+
+    def remove(self, node):
+        name = getattr(node, self.field)
+        if name is None:
+            return
+        k = key(name)
+        found = self.nodes.get(k, [])
+        for i, n in enumerate(found):
+            if n is node:
+                del found[i]
+                break
+        if not found:
+            self.nodes.pop(k, None)
+
+
+class Node(object):
+    """
+    The base of all model classes.  Attributes are declared in
+    __slots__ so nodes have no per-instance __dict__.  Nodes are
+    pickled (and printed) using their state: {name:value} of each
+    slot that has been assigned.
+    """
+
+    __slots__ = ()
+
+    def __getstate__(self):
+        state = {}
+        for name in fields(self.__class__):
+            try:
+                state[name] = getattr(self, name)
+            except AttributeError:
+                pass
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+class Object(Node):
+    __slots__ = ('name',)
 
     def __init__(self, name=None):
         self.name = name
@@ -51,6 +447,8 @@ class Object(object):
 
 
 class Table(Object):
+    __slots__ = ('_global', '_temporary', 'columns', 'constraints', 'modifiers',
+                 'indexed')
 
     def __init__(self, name):
         Object.__init__(self, name)
@@ -62,6 +460,7 @@ class Table(Object):
 
      
 class Column(Object):
+    __slots__ = ('table', 'modifiers')
 
     def __init__(self, name):
         Object.__init__(self, name)
@@ -74,6 +473,7 @@ class Column(Object):
                 yield m
 
 class Default(Object):
+    __slots__ = ('value',)
     
     def __init__(self, value):
         Object.__init__(self)
@@ -81,18 +481,22 @@ class Default(Object):
 
 
 class NotNull(Object):
+    __slots__ = ()
     
     def __init__(self, name=None):
         Object.__init__(self, name)  
 
         
 class Constraint(Object):
+    __slots__ = ()
 
     def __init__(self, name):
         Object.__init__(self, name)
 
 
 class PK(Constraint):
+    __slots__ = ('columns', 'modifiers')
+
     def __init__(self, name, columns):
         Constraint.__init__(self, name)
         self.columns = columns
@@ -100,16 +504,24 @@ class PK(Constraint):
 
 
 class PkMod(PK):
+    __slots__ = ()
+
     def __init__(self, name=None):
         PK.__init__(self, name, None)
 
         
 class FK(Constraint):
+    __slots__ = ('refA', 'refB', 'ondelete')
     
-    class Cascade: pass
-    class Setnull: pass
+    class Cascade(Node):
+        __slots__ = ()
+
+    class Setnull(Node):
+        __slots__ = ()
+
+    class Reference(Node):
+        __slots__ = ('table', 'columns')
 
-    class Reference:
         def __init__(self, table, columns):
             self.table = table
             self.columns = columns
@@ -122,12 +534,14 @@ class FK(Constraint):
 
 
 class FkMod(FK):
+    __slots__ = ()
 
     def __init__(self, name=None):
         FK.__init__(self, name)
             
         
 class CkMod(Constraint):
+    __slots__ = ('expression',)
 
     def __init__(self, name, expression):
         Constraint.__init__(self, name)
@@ -135,6 +549,7 @@ class CkMod(Constraint):
         
 
 class Unique(Constraint):
+    __slots__ = ('columns', 'modifiers')
 
     def __init__(self, name, columns):
         Constraint.__init__(self, name)
@@ -143,12 +558,14 @@ class Unique(Constraint):
 
 
 class UniqueMod(Unique):
+    __slots__ = ()
 
     def __init__(self, name=None):
         Unique.__init__(self, name, None)
 
 
 class Type(Object):
+    __slots__ = ('precision',)
 
     def __init__(self, name, precision=None):
         Object.__init__(self, name)
@@ -156,6 +573,7 @@ class Type(Object):
         
         
 class Index(Object):
+    __slots__ = ('table', 'columns', 'unique', 'modifiers')
 
     def __init__(self, name, table, columns):
         Object.__init__(self, name)
@@ -166,16 +584,18 @@ class Index(Object):
         
         
 class Tablespace(Object):
+    __slots__ = ()
 
     def __init__(self, name):
         Object.__init__(self, name)
         
 
 class TsMod(Tablespace):
-    pass
+    __slots__ = ()
 
 
 class Logging(Object):
+    __slots__ = ('enabled',)
     
     def __init__(self, enabled):
         Object.__init__(self)
@@ -183,6 +603,7 @@ class Logging(Object):
 
 
 class Parallel(Object):
+    __slots__ = ('enabled', 'n')
 
     def __init__(self, enabled, n=None):
         Object.__init__(self)
@@ -191,6 +612,7 @@ class Parallel(Object):
         
 
 class RowMovement(Object):
+    __slots__ = ('enabled',)
 
     def __init__(self, enabled=True):
         Object.__init__(self)
@@ -198,6 +620,7 @@ class RowMovement(Object):
         
 
 class OnCommit(Object):
+    __slots__ = ('preserve',)
 
     def __init__(self, preserve=True):
         Object.__init__(self)
@@ -205,13 +628,16 @@ class OnCommit(Object):
 
 
 class Sequence(Object):
+    __slots__ = ('modifiers',)
     
-    class StartWith:
+    class StartWith(Node):
+        __slots__ = ('start',)
+
         def __init__(self, n):
             self.start = n
             
-    class Order:
-        pass
+    class Order(Node):
+        __slots__ = ()
     
     def __init__(self, name):
         Object.__init__(self, name)
@@ -219,6 +645,7 @@ class Sequence(Object):
 
 
 class TableComment(Object):
+    __slots__ = ('table', 'text')
 
     def __init__(self, table, text):
         Object.__init__(self)
@@ -227,6 +654,7 @@ class TableComment(Object):
 
 
 class ColumnComment(TableComment):
+    __slots__ = ('column',)
 
     def __init__(self, table, column, text):
         TableComment.__init__(self, table, text)
@@ -234,6 +662,7 @@ class ColumnComment(TableComment):
 
 
 class Synonym(Object):
+    __slots__ = ('synonym', 'referenced')
 
     def __init__(self, synonym, referenced=None):
         Object.__init__(self)
@@ -242,28 +671,29 @@ class Synonym(Object):
 
 
 class Drop(Object):
+    __slots__ = ('object',)
     
     def __init__(self, t, n):
         Object.__init__(self)
         self.object = self.get(t, n)
     
     class Table(Object):
-        pass
+        __slots__ = ()
     
     class Index(Object):
-        pass
+        __slots__ = ()
    
     class Column(Object):
-        pass
+        __slots__ = ()
 
     class Constraint(Object):
-        pass
+        __slots__ = ()
     
     class Sequence(Object):
-        pass
+        __slots__ = ()
     
     class Synonym(Object):
-        pass
+        __slots__ = ()
     
     @classmethod
     def get(cls, t, n):
@@ -279,30 +709,39 @@ class Drop(Object):
         return clsmap.get(t)(n)
 
 
-class Rename:
+class Rename(Node):
+    __slots__ = ('object',)
     
     def __init__(self, object):
         self.object = object
     
     class Table(Object):
+        __slots__ = ('newname',)
+
         def __init__(self, name, newname):
             Object.__init__(self, name)
             self.newname = newname
     
     class Column(Object):
+        __slots__ = ('newname',)
+
         def __init__(self, name, newname):
             Object.__init__(self, name)
             self.newname = newname
             
             
-class Modify:
+class Modify(Node):
+    __slots__ = ('columns',)
+
     def __init__(self, columns=()):
         self.columns = columns
 
 
-class Alter:
+class Alter(Node):
+    __slots__ = ()
 
     class Table(Object):
+        __slots__ = ('table', 'adds', 'mods', 'drops')
         
         def __init__(self, table, adds=(), mods=(), drops=()):
             Object.__init__(self)
@@ -315,6 +754,7 @@ class Alter:
             return ( len(self.adds) + len(self.mods) + len(self.drops) )
 
     class Index(Object):
+        __slots__ = ('index', 'mods')
         
         def __init__(self, index, mods):
             Object.__init__(self)
@@ -323,6 +763,7 @@ class Alter:
         
 
 class Insert(Object):
+    __slots__ = ('table', 'columns', 'values')
     
     def __init__(self, table, columns, values):
         Object.__init__(self)
@@ -332,10 +773,11 @@ class Insert(Object):
         
 
 class Commit(Object):
-    pass
+    __slots__ = ()
         
         
 class Function(Object):
+    __slots__ = ('args',)
 
     def __init__(self, name, args):
         Object.__init__(self, name)
@@ -343,10 +785,125 @@ class Function(Object):
 
 
 class Expression(Object):
+    """
+    An expression.  While parsing, terms may contain (nested)
+    expressions so that each is built in time proportional to its own
+    terms; L{flatten} replaces them with their terms.
+    @ivar terms: The list of terms.
+    @type terms: list
+    """
+
+    __slots__ = ('terms',)
     
     def __init__(self, terms):
         Object.__init__(self)
         self.terms = terms
 
+    def flatten(self):
+        """
+        Replace nested expressions with their terms (in place).
+        Iterative so deeply nested expressions cannot exhaust the stack.
+        @return: self
+        @rtype: L{Expression}
+        """
+        terms = []
+        stack = [iter(self.terms)]
+        while stack:
+            for t in stack[-1]:
+                if isinstance(t, Expression):
+                    stack.append(iter(t.terms))
+                    break
+                terms.append(t)
+            else:
+                stack.pop()
+        self.terms = terms
+        return self
+
 class Include(Object):
-    pass
\ No newline at end of file
+    __slots__ = ()
+
+
+slotted = {}
+
+def fields(cls):
+    """
+    Get the attribute (slot) names of a model class, including
+    those inherited, base class first.
+    @rtype: tuple
+    """
+    names = slotted.get(cls)
+    if names is None:
+        names = []
+        for c in reversed(cls.__mro__):
+            for name in c.__dict__.get('__slots__', ()):
+                if name not in names:
+                    names.append(name)
+        names = tuple(names)
+        slotted[cls] = names
+    return names
+
+
+#
+# Identifiers are interned as they are parsed so that the many
+# references to a name share one string.  The (interned) upper-cased
+# lookup key of each is kept alongside the original spelling.
+#
+
+keys = {}
+
+def identifier(name):
+    """ get the interned identifier """
+    name = intern(name)
+    if name not in keys:
+        keys[name] = intern(name.upper())
+    return name
+
+def key(name):
+    """ get the (upper-cased) lookup key for the identifier """
+    k = keys.get(name)
+    if k is None:
+        return name.upper()
+    return k
+
+
+#
+# Python cannot pickle nested classes (Drop.Table, FK.Reference, ...)
+# by name, so they are registered with copy_reg and pickled using
+# their qualified names.
+#
+
+def nested(path):
+    """ create an (empty) instance of the nested class by qualified name """
+    cls = sys.modules[__name__]
+    for name in path.split('.'):
+        cls = getattr(cls, name)
+    return cls.__new__(cls)
+
+def classes(outer=None, path=None):
+    """
+    Get the model classes, including nested classes.
+    @return: {qualified name:class}
+    @rtype: dict
+    """
+    result = {}
+    if outer is None:
+        outer = sys.modules[__name__]
+    for name, cls in vars(outer).items():
+        if not isinstance(cls, type) or cls.__module__ != __name__:
+            continue
+        if path is None:
+            qname = name
+        else:
+            qname = '.'.join((path, name))
+        result[qname] = cls
+        result.update(classes(cls, qname))
+    return result
+
+def register():
+    for qname, cls in classes().items():
+        if '.' not in qname:
+            continue
+        reducer = ( lambda x, qname=qname: (nested, (qname,), x.__getstate__()) )
+        copy_reg.pickle(cls, reducer)
+
+register()
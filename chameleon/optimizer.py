@@ -35,6 +35,21 @@ class Optimizer:
                 return w
         return None
         
+    def exported(self, n=0):
+        """
+        Get the warnings (starting at index n) with their types.
+        @return: [(type,args),]
+        @rtype: list
+        """
+        return [(self.findwarning(w[0]), w[1]) for w in self.warnings[n:]]
+
+    def restore(self, warnings):
+        """ add (and show) exported warnings: [(type,args),] """
+        for w, args in warnings:
+            if self.findwarning(w[0]) is None:
+                self.warningtypes.append(w)
+            self.warning(w[0], *args)
+        
     def warning(self, wid, *args):
         w = self.findwarning(wid)
         self.warnings.append((wid, args))
@@ -78,7 +93,7 @@ class Basic(Optimizer):
         self.warningtypes += self.BasicWarnings
 
     def process(self, model):
-        for ex in model.extra:
+        for ex in list(model.extra):
             if isinstance(ex, Alter.Table):
                 table = model.tables.get(ex.table)
                 if table is None: 
@@ -86,7 +101,7 @@ class Basic(Optimizer):
                 self.warning(1, table.name)
                 unused = []
                 for a in ex.adds:
-                    table.constraints.append(a)
+                    model.addconstraint(table, a)
                     unused.append(a)
                 ex.adds = list(ex.adds)
                 for a in unused:
@@ -101,7 +116,7 @@ class Basic(Optimizer):
                 for m in unused:
                     ex.mods.remove(m)
                 if not len(ex):
-                    model.content.remove(ex)
+                    model.remove(ex)
             if isinstance(ex, Alter.Index):
                 index = model.indexes.get(ex.index)
                 if index is None: 
@@ -109,7 +124,7 @@ class Basic(Optimizer):
                 self.warning(2, index.name)
                 for m in ex.mods:
                     index.modifiers.append(m)
-                model.content.remove(ex)               
+                model.remove(ex)               
         return model
                 
                 
@@ -155,38 +170,38 @@ class BestPractices(Basic):
         self.fixindexes(model)
         return model
     
-    def fixcolumn(self, c):
-        self.redundant(c)
-        self.anonymous(c)
-        self.named(c)
+    def fixcolumn(self, model, c):
+        self.redundant(model, c)
+        self.anonymous(model, c)
+        self.named(model, c)
     
-    def anonymous(self, c):
+    def anonymous(self, model, c):
         for m in c.modifiers:
             if isinstance(m, FkMod):
                 if m.anonymous():
                     self.warning(10, 'fk', c.table.name, c.name)
-                    m.name = '%s_fk' % c.name
+                    model.rename(c.table, m, '%s_fk' % c.name)
                 continue
             if isinstance(m, CkMod):
                 if m.anonymous():
                     self.warning(10, 'check', c.table.name, c.name)
-                    m.name = '%s_ck' % c.name
+                    model.rename(c.table, m, '%s_ck' % c.name)
                 continue
             if isinstance(m, UniqueMod):
                 if m.anonymous():
                     self.warning(10, 'unique', c.table.name, c.name)
-                    m.name = '%s_uq' % c.name
+                    model.rename(c.table, m, '%s_uq' % c.name)
                 continue
             
-    def named(self, c):
+    def named(self, model, c):
         for m in c.modifiers:
             if isinstance(m, NotNull):
                 if m.named():
                     self.warning(20, m.name, c.table.name, c.name)
-                    m.name = None
+                    model.rename(c.table, m, None)
                 continue
     
-    def redundant(self, c):
+    def redundant(self, model, c):
         pk = []
         for m in c.modifiers:
             if isinstance(m, PkMod):
@@ -204,40 +219,40 @@ class BestPractices(Basic):
                     unused.append(m)
                 continue
         for m in unused:
-            c.modifiers.remove(m)
+            model.removemodifier(c, m)
         return pk
     
     def fixtables(self, model):
         for t in model.tables.values():
-            self.fixtable(t)
+            self.fixtable(model, t)
                     
-    def fixtable(self, t):
-        self.promote(t)
+    def fixtable(self, model, t):
+        self.promote(model, t)
         for c in t.columns:
-            self.fixcolumn(c)
+            self.fixcolumn(model, c)
         
-    def promote(self, t):
+    def promote(self, model, t):
         unused = []
         for m in t.constraints:
             if isinstance(m, PK):
                 if len(m.columns) > 1:
                     continue
                 name = m.columns[0]
-                column = self.findcolumn(t, name)
+                column = model.column(t, name)
                 if column is None:
                     continue
                 self.warning(40, 'pk', m.name, t.name, name)
                 mod = PkMod()
                 mod.name = m.name
                 mod.modifiers = m.modifiers
-                column.modifiers.append(mod)
+                model.addmodifier(column, mod)
                 unused.append(m)
                 continue
             if isinstance(m, FK):
                 if len(m.refA.columns) > 1:
                     continue
                 name = m.refA.columns[0]
-                column = self.findcolumn(t, name)
+                column = model.column(t, name)
                 if column is None:
                     continue
                 self.warning(40, 'fk', m.name, t.name, name)
@@ -246,34 +261,34 @@ class BestPractices(Basic):
                 mod.refA = m.refA
                 mod.refB = m.refB
                 mod.ondelete = m.ondelete
-                column.modifiers.append(mod)
+                model.addmodifier(column, mod)
                 unused.append(m)
                 continue
             if isinstance(m, Unique):
                 if len(m.columns) > 1:
                     continue
                 name = m.columns[0]
-                column = self.findcolumn(t, name)
+                column = model.column(t, name)
                 if column is None:
                     continue
                 self.warning(40, 'unique', m.name, t.name, name)
                 mod = UniqueMod()
                 mod.name = m.name
                 mod.modifiers = m.modifiers
-                column.modifiers.append(mod)
+                model.addmodifier(column, mod)
                 unused.append(m)
                 continue
             if isinstance(m, NotNull):
                 name = m.columns[0]
-                column = self.findcolumn(t, name)
+                column = model.column(t, name)
                 if column is None:
                     continue
                 self.warning(40, 'not null', m.name, t.name, name)
-                column.modifiers.append(mod)
+                model.addmodifier(column, mod)
                 unused.append(m)
                 continue
         for m in unused:
-            t.constraints.remove(m)
+            model.removeconstraint(t, m)
             
     def fixindexes(self, model):
         unused = []
@@ -286,27 +301,17 @@ class BestPractices(Basic):
                 for m in c.modifiers:
                     if isinstance(m, (PkMod, UniqueMod)):
                         t.indexed[(c.name,)] = m
-        for i in model.indexes.values():
-            t = model.tables.get(i.table)
-            if t is None:
-                return
-            indexed = tuple(i.columns)
-            c = t.indexed.get(indexed)
-            if c is None:
-                continue
-            self.warning(50, i.name, c.name, t.name)
-            for m in i.modifiers:
-                if isinstance(m, Tablespace):
-                    c.modifiers.append(TsMod(m.name))
+            for i in model.tableindexes(t.name):
+                indexed = tuple(i.columns)
+                c = t.indexed.get(indexed)
+                if c is None:
                     continue
-                c.modifiers.append(m)
-            unused.append(i)
+                self.warning(50, i.name, c.name, t.name)
+                for m in i.modifiers:
+                    if isinstance(m, Tablespace):
+                        c.modifiers.append(TsMod(m.name))
+                        continue
+                    c.modifiers.append(m)
+                unused.append(i)
         for i in unused:
-            model.content.remove(i)
-            del model.indexes[i.name]
-            
-    def findcolumn(self, t, name):
-        for c in t.columns:
-            if c.name == name:
-                return c
-        return None
\ No newline at end of file
+            model.remove(i)
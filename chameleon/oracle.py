@@ -97,7 +97,7 @@ class Type(Plugin):
     }
     
     def xlated(self, t):
-        fn = self.tab.get(t.name.upper())
+        fn = self.tab.get(model.key(t.name))
         if fn is None:
             return t
         else:
@@ -106,7 +106,7 @@ class Type(Plugin):
     def render(self, type, n=0):
         t = self.xlated(type)
         s = []
-        s.append(t.name.upper())
+        s.append(model.key(t.name))
         if t.precision is not None:
             s.append('(')
             s.append(str(t.precision))
@@ -178,7 +178,7 @@ class Translator:
         if self.dquoted(s):
             content = s[1:-1]
             return "'%s'" % content
-        return self.xtab.get(s.upper(), s)
+        return self.xtab.get(model.key(s), s)
     
     def dquoted(self, s):
         return ( s[0] == '"' and s[-1] == '"' )
@@ -14,8 +14,23 @@
 # Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
 
 from ply import *
+from chameleon import __version__
 from chameleon.model import *
+from chameleon.scanner import Scanner, squoted
+from chameleon.splitter import Splitter
+from cStringIO import StringIO
+from bisect import bisect_right
+import re
+import mmap
+import types
+import time
 import sys
+import os
+
+try:
+    from hashlib import md5
+except ImportError:
+    from md5 import new as md5
 
 
 #######################################################
@@ -112,6 +127,7 @@ tokens = [
     'SQLCOMMENT',
     'STARTCOMMENT',
     'ENDCOMMENT',
+    'COMMENTBODY',
     'INCLUDE',
     'MACRO',
     'WHITESPACE',
@@ -125,10 +141,16 @@ tokens = [
     'LTEQ',
     'PLUS',
     'MINUS',
+    'INSERTED',
 ] + keywords + symbols
 
 def t_SQUOTED(t):
-    r"'([^']|'')*'"
+    r"'[^']*'"
+    lexer = t.lexer
+    end = squoted(lexer.lexdata, lexer.lexpos)
+    if end > lexer.lexpos:
+        t.value = lexer.lexdata[t.lexpos:end]
+        lexer.lexpos = end
     return t
 
 def t_DQUOTED(t):
@@ -136,7 +158,7 @@ def t_DQUOTED(t):
     return t
 
 def t_WHITESPACE(t):
-    r'[ \t]+'
+    r'[ \t\r]+'
     pass
 
 def t_SQLCOMMENT(t):
@@ -150,14 +172,20 @@ def t_STARTCOMMENT(t):
 def t_COMMENT_ENDCOMMENT(t):
     r'\*\/'
     t.lexer.pop_state()
+
+def t_COMMENT_COMMENTBODY(t):
+    r'(?:[^*]+|\*+(?!/))+'
+    t.lexer.lineno += t.value.count('\n')
     
 def t_MACRO(t):
     r'\[\[.+\]\]'
+    t.value = intern(t.value)
     return t
 
 def t_IDENTIFIER(t):
     r'[a-zA-Z][\.a-zA-Z_0-9]*'
-    v = t.value.upper()
+    t.value = identifier(t.value)
+    v = key(t.value)
     for k in keywords:
         if k == v:
             t.type = k
@@ -165,7 +193,7 @@ def t_IDENTIFIER(t):
     return t
 
 def t_INCLUDE(t):
-    r'(@|\\i[\s]+)[^\n]+'
+    r'(@|\\i[\s]+)[^\r\n]+'
     v = t.value
     if v[0] == '@':
         t.value = v[1:]
@@ -192,15 +220,27 @@ def t_ANY_newline(t):
     t.lexer.lineno += len(t.value)
 
 def t_error(t):
+    lexer = t.lexer
+    data = lexer.lexdata
+    offset = lexer.lexpos
+    end = unexpected.match(data, offset+1).end()
+    skipped = data[offset:end]
+    if len(skipped) > 10:
+        skipped = '%s...' % skipped[:10]
+    lines = Lines.get(lexer)
     s = []
-    pos, snip = column(t.lexer)
     s.append('(')
-    s.append(t.value[0])
+    s.append(skipped)
     s.append(') unexpected at: ')
-    s.append('%d:%d' % (t.lineno, pos))
-    s.append(' snip: "%s", skipped' % snip)
+    s.append('%d:%d' % (t.lineno, lines.column(offset)))
+    s.append(' snip: "%s", skipped' % lines.snip(offset))
+    if end-offset > 1:
+        s.append(' (%d characters)' % (end-offset))
     print ''.join(s)
-    t.lexer.skip(1)
+    lexer.skip(end-offset)
+    lexer.errors = getattr(lexer, 'errors', 0) + 1
+    if lexer.errors >= Parser.maxerrors:
+        raise Exception('too many errors (%d), aborted' % lexer.errors)
     
 def t_COMMENT_error(t):
     t.lexer.skip(1)
@@ -274,41 +314,25 @@ def p_expression(p):
         | LPAREN expression RPAREN operator term
     """
     if len(p) == 3:
-        ex = Expression([p[1]])
         digits = p[2]
         if digits[0] == '-':
-            ex.terms.append('-')
-            ex.terms.append(digits[1:])
+            p[0] = Expression([p[1], '-', digits[1:]])
         else:
-            ex.terms.append('+')
-            ex.terms.append(digits)
-        p[0] = ex
+            p[0] = Expression([p[1], '+', digits])
         return
     if isinstance(p[1], Expression):
-        ex = p[1]
-        ex.terms.append(p[2])
-        ex.terms += p[3].terms
-        p[0] = ex
+        p[0] = Expression(p[1:4])
         return
     if p[1] == '(':
-        ex = p[2]
-        ex.terms.insert(0, p[1])
-        ex.terms.append(p[3])
-        if len(p) > 4:
-            ex.terms += p[4:6]
-        p[0] = ex
+        p[0] = Expression(p[1:])
         return
-    if p[3] == '(': 
-        ex = Expression(p[1:4])
+    if p[3] == '(':
         if isinstance(p[4], Expression):
-            ex.terms += p[4].terms
+            p[0] = Expression(p[1:])
         else:
-            ex.terms += p[4]
-        ex.terms.append(p[5])
-        p[0] = ex
+            p[0] = Expression(p[1:4]+p[4]+p[5:6])
         return
-    ex = Expression(p[1:])
-    p[0] = ex
+    p[0] = Expression(p[1:])
 
 def p_identifier(p):
     """ identifier : IDENTIFIER
@@ -502,9 +526,9 @@ def p_ckmod(p):
         | CONSTRAINT identifier CHECK LPAREN expression RPAREN
     """
     if len(p) == 5:
-        p[0] = CkMod(None, p[3])
+        p[0] = CkMod(None, p[3].flatten())
     else:
-        p[0] = CkMod(p[2], p[5])
+        p[0] = CkMod(p[2], p[5].flatten())
     
 def p_pkmod(p):
     """
@@ -579,6 +603,8 @@ def p_value(p):
         | IDENTIFIER
         | expression
     """
+    if isinstance(p[1], Expression):
+        p[1].flatten()
     p[0] = p[1]
     
 def p_default(p):
@@ -828,6 +854,7 @@ def p_clutter(p):
         | SQLCOMMENT
         | STARTCOMMENT
         | ENDCOMMENT
+        | COMMENTBODY
     """
     pass
 
@@ -980,7 +1007,11 @@ def p_insert(p):
     """
     insert : baseInsert insertValues SEMICOLON
         | baseInsert insertColumns insertValues SEMICOLON
+        | INSERTED
     """
+    if len(p) == 2:
+        p[0] = p[1]
+        return
     if len(p) == 4:
         p[0] = Insert(p[1], (), p[2])
     else:
@@ -1029,8 +1060,8 @@ def p_error(p):
         raise Exception(msg)
     s = []
     if hasattr(p, 'lexer'):
-        pos, snip = column(p.lexer)
-        pos =+ len(p.value)
+        lines = Lines.get(p.lexer)
+        pos, snip = (lines.column(p.lexpos), lines.snip(p.lexpos))
     else:
         pos, snip = (0, '')
     s.append('Syntax Error:')
@@ -1048,42 +1079,692 @@ def p_error(p):
 # Utility
 #######################################################
 
-def getsnip(data, offset):
-    width = 60
-    start = offset
-    for n in range(0, width/2):
-        if start < 1: break
-        if data[start-1] == '\n':
-            break
-        start -= 1
-    end = offset
-    for n in range(0, width/2):
-        if data[end] == '\n':
-            break
-        end += 1
-    return data[start:end] 
-        
-def column(lexer):
-    pos = 0
-    offset = (lexer.lexpos-1)
-    data = lexer.lexdata
-    i = offset
-    while i > 0:
-        c = data[i]
-        if c == '\n':
-            break
-        pos += 1
-        i -= 1
-    snip = getsnip(data, offset)
-    return (pos, snip)
+#
+# Characters that cannot start a token.  A run of them following an
+# unexpected character is reported (and skipped) as a single error.
+#
+unexpected = re.compile(r"""[^\sa-zA-Z0-9'"/\[@\\();,!=<>+\-#]*""")
+
+
+class Lines:
+    """
+    An index of the offsets at which the lines of the input start.
+    Used to find the column of an offset (bisect) and the snip of
+    the line surrounding it, when reporting errors.  Built once per
+    input, on the first error.
+    @ivar data: The input (string or mmap).
+    @ivar offsets: The (sorted) offsets at which lines start.
+    @type offsets: list
+    """
+
+    newline = re.compile('\n')
+
+    @classmethod
+    def get(cls, lexer):
+        """ get the index for the lexer input """
+        lines = getattr(lexer, 'lines', None)
+        if lines is None or lines.data is not lexer.lexdata:
+            lines = cls(lexer.lexdata)
+            lexer.lines = lines
+        return lines
+
+    def __init__(self, data):
+        self.data = data
+        self.offsets = [0]
+        self.offsets += [m.end() for m in self.newline.finditer(data)]
+
+    def line(self, offset):
+        """ get the (0 based) index of the line containing the offset """
+        return bisect_right(self.offsets, offset)-1
+
+    def column(self, offset):
+        """ get the (1 based) column of the offset """
+        return offset-self.offsets[self.line(offset)]+1
+
+    def snip(self, offset, width=60):
+        """ get the text surrounding the offset on its line """
+        n = self.line(offset)
+        start = max(self.offsets[n], offset-width/2)
+        if n+1 < len(self.offsets):
+            end = self.offsets[n+1]-1
+        else:
+            end = len(self.data)
+        end = min(end, offset+width/2)
+        return self.data[start:end]
+
+
+#######################################################
+# Fast INSERT
+#######################################################
+
+class Inserts:
+    """
+    A lexer filter that provides a fast path for plain INSERT
+    statements.  The tokens of an INSERT having only literal,
+    identifier and function call values are recognized here and
+    replaced by a single INSERTED token whose value is the L{Insert}.
+    Anything else is replayed to the parser unchanged.
+    @ivar lexer: The wrapped lexer.
+    @ivar pending: Tokens to be replayed: [(token,lexpos),] (reversed)
+    @type pending: list
+    """
+
+    literals = set((
+        'SQUOTED',
+        'DQUOTED',
+        'DIGITS',
+        'SYSDATE',
+        'CURRENT_TIMESTAMP',
+        'CURRENT_DATE',
+        'NULL',
+        'IDENTIFIER',
+    ))
+
+    identifiers = set(p_identifier.__doc__.split(':', 1)[1].replace('|', ' ').split())
+
+    def __init__(self, lexer):
+        self.lexer = lexer
+        self.lexpos = lexer.lexpos
+        self.pending = []
+
+    def __getattr__(self, name):
+        return getattr(self.lexer, name)
+
+    def input(self, data):
+        self.lexer.input(data)
+        self.lexpos = self.lexer.lexpos
+        self.pending = []
+
+    def token(self):
+        if self.pending:
+            t, self.lexpos = self.pending.pop()
+            return t
+        t = self.lexer.token()
+        self.lexpos = self.lexer.lexpos
+        if t is None or t.type != 'INSERT':
+            return t
+        return self.insert(t)
+
+    def insert(self, first):
+        """
+        Read the tokens of the statement and try to build the L{Insert}.
+        """
+        tokens = [first]
+        positions = [self.lexpos]
+        while True:
+            t = self.lexer.token()
+            if t is None:
+                break
+            tokens.append(t)
+            positions.append(self.lexer.lexpos)
+            if t.type == 'SEMICOLON':
+                break
+        try:
+            insert = self.match(tokens)
+        except IndexError:
+            insert = None
+        if insert is None:
+            self.pending = zip(tokens, positions)
+            self.pending.reverse()
+            t, self.lexpos = self.pending.pop()
+            return t
+        t = lex.LexToken()
+        t.type = 'INSERTED'
+        t.value = insert
+        t.lineno = first.lineno
+        t.lexpos = first.lexpos
+        self.lexpos = positions[-1]
+        return t
+
+    def match(self, tokens):
+        """
+        Match: INSERT INTO identifier [(reflist)] VALUES (values) ;
+        @return: The L{Insert} or None when not matched.
+        """
+        if tokens[1].type != 'INTO' or tokens[2].type not in self.identifiers:
+            return None
+        table = tokens[2].value
+        columns = ()
+        i = 3
+        if tokens[i].type == 'LPAREN':
+            columns = []
+            i += 1
+            while True:
+                t = tokens[i]
+                if t.type not in self.identifiers:
+                    return None
+                columns.append(t.value)
+                t = tokens[i+1]
+                i += 2
+                if t.type == 'RPAREN':
+                    break
+                if t.type != 'COMMA':
+                    return None
+        if tokens[i].type != 'VALUES' or tokens[i+1].type != 'LPAREN':
+            return None
+        values, i = self.values(tokens, i+2)
+        if values is None or i != len(tokens)-1:
+            return None
+        if tokens[i].type != 'SEMICOLON':
+            return None
+        return Insert(table, columns, values)
+
+    def values(self, tokens, i):
+        """
+        Match: value [, value] ) where value is a literal, an
+        identifier or a function call.
+        @return: (values, index following the RPAREN).  The values
+            are None when not matched.
+        """
+        values = []
+        while True:
+            t = tokens[i]
+            if tokens[i+1].type == 'LPAREN':
+                if t.type not in self.identifiers:
+                    return (None, i)
+                args, i = self.values(tokens, i+2)
+                if args is None:
+                    return (None, i)
+                values.append(Function(t.value, args))
+            elif t.type in self.literals:
+                values.append(t.value)
+                i += 1
+            else:
+                return (None, i)
+            t = tokens[i]
+            i += 1
+            if t.type == 'RPAREN':
+                return (values, i)
+            if t.type != 'COMMA':
+                return (None, i)
+
+
+#######################################################
+# Tables
+#######################################################
+
+def digestcode(h, code):
+    """
+    Update the digest with the code object.  Nested code (lambdas,
+    comprehensions, ...) is included.  Line numbers are not.
+    """
+    h.update(code.co_code)
+    h.update(' '.join(code.co_names))
+    for x in code.co_consts:
+        if isinstance(x, types.CodeType):
+            digestcode(h, x)
+        else:
+            h.update(repr(x))
+
+
+class Tables:
+    """
+    The on-disk cache of generated LALR tables.
+    Tables are stored as pickle files named by a digest of the
+    grammar (rule docstrings, tokens, precedence and lexer rules) so
+    a grammar change never loads stale tables.  Pregenerated tables
+    shipped in the package directory are used first, then the user
+    cache directory ($CHAMELEON_CACHE or ~/.cache/chameleon).
+    @cvar version: The cache format version (part of the digest).
+    @type version: int
+    """
+
+    version = 1
+
+    def __init__(self):
+        self.digest = self.grammar()
+
+    def grammar(self):
+        """ get the digest of the grammar """
+        module = sys.modules[__name__]
+        h = md5()
+        h.update(str(self.version))
+        h.update(str(__version__))
+        h.update(str(yacc.__tabversion__))
+        h.update(' '.join(tokens))
+        h.update(repr(precedence))
+        h.update(repr(states))
+        for name in sorted(dir(module)):
+            if not name.startswith(('p_', 't_')):
+                continue
+            rule = getattr(module, name)
+            h.update(name)
+            if isinstance(rule, basestring):
+                h.update(rule)
+            else:
+                h.update(str(rule.__doc__))
+        return h.hexdigest()
+
+    def models(self):
+        """
+        Get the digest of the models produced by parsing: the grammar,
+        the code of the parser, scanner and model (grammar actions,
+        fast paths, ...) and the layout (slots) of the model classes.
+        Caches of parsed models are keyed by it so that changes to
+        how models are built (or pickled) never load stale models.
+        """
+        from chameleon import model, scanner
+        h = md5()
+        h.update(self.digest)
+        for module in (sys.modules[__name__], scanner, model):
+            for name, x in sorted(vars(module).items()):
+                if getattr(x, '__module__', None) != module.__name__:
+                    continue
+                h.update(name)
+                if isinstance(x, (type, types.ClassType)):
+                    for n, m in sorted(vars(x).items()):
+                        if isinstance(m, types.FunctionType):
+                            h.update(n)
+                            digestcode(h, m.func_code)
+                elif isinstance(x, types.FunctionType):
+                    digestcode(h, x.func_code)
+        for name, cls in sorted(model.classes().items()):
+            h.update(name)
+            h.update(' '.join(model.fields(cls)))
+        return h.hexdigest()
+
+    def filename(self):
+        return 'parsetab-%s.pickle' % self.digest
+
+    def packaged(self):
+        """ get the path to the tables shipped with the package """
+        pkgdir = os.path.dirname(os.path.abspath(__file__))
+        return os.path.join(pkgdir, self.filename())
+
+    def cachedir(self):
+        """ get the user cache directory """
+        cachedir = os.environ.get('CHAMELEON_CACHE')
+        if not cachedir:
+            cachedir = os.path.join('~', '.cache', 'chameleon')
+        return os.path.expanduser(cachedir)
+
+    def cached(self):
+        """ get the path to the tables in the user cache """
+        return os.path.join(self.cachedir(), self.filename())
+
+    def load(self, optimized=0):
+        """
+        Build the parser using cached tables when available.  When
+        not, the tables are generated and stored in the user cache.
+        """
+        for path in (self.packaged(), self.cached()):
+            if os.path.exists(path):
+                return self.build(path, optimized)
+        return self.generate(self.cachedir(), optimized)
+
+    def generate(self, cachedir, optimized=0):
+        """
+        Generate the tables and store them in the specified directory.
+        The tables are written to a private file and renamed into
+        place so that concurrent processes never read a partial file.
+        When they cannot be written (a read-only or invalid cache
+        directory), the tables are generated but not stored.
+        """
+        path = os.path.join(cachedir, self.filename())
+        try:
+            if not os.path.isdir(cachedir):
+                os.makedirs(cachedir)
+        except OSError:
+            pass
+        tmp = '%s.%d.tmp' % (path, os.getpid())
+        try:
+            parser = self.build(tmp, optimized)
+        except EnvironmentError:
+            return yacc.yacc(
+                start='script',
+                optimize=optimized,
+                debug=0,
+                write_tables=0)
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+        return parser
+
+    def build(self, path, optimized=0):
+        return yacc.yacc(
+            start='script',
+            optimize=optimized,
+            debug=0,
+            write_tables=0,
+            picklefile=path)
+
+
+#######################################################
+# Profile
+#######################################################
+
+class Profile:
+    """
+    A profile of the grammar rule actions (p_*) and the tokens
+    produced by the lexer.  Nothing is instrumented unless a
+    profile is installed (see L{Parser.profile}).
+    @ivar rules: The rule actions: {name:[calls,seconds]}
+    @type rules: dict
+    @ivar tokens: The token counts: {type:count}
+    @type tokens: dict
+    @ivar lexing: The time spent in the lexer (seconds).
+    @type lexing: float
+    """
+
+    def __init__(self):
+        self.rules = {}
+        self.tokens = {}
+        self.lexing = 0.0
+
+    def instrument(self, parser):
+        """ wrap the rule actions bound to the productions """
+        wrapped = {}
+        for production in parser.productions:
+            fn = production.callable
+            if fn is None:
+                continue
+            timed = wrapped.get(fn)
+            if timed is None:
+                timed = self.timed(production.func, fn)
+                wrapped[fn] = timed
+            production.callable = timed
+
+    def timed(self, name, fn):
+        stats = self.rules.setdefault(name, [0, 0.0])
+        clock = time.time
+        def timed(p):
+            started = clock()
+            fn(p)
+            stats[1] += clock()-started
+            stats[0] += 1
+        return timed
+
+    def lexer(self, lexer):
+        return Counted(lexer, self)
+
+    def report(self):
+        s = []
+        s.append('grammar rules:')
+        s.append('%8s %10s  %s' % ('calls', 'seconds', 'rule'))
+        rules = sorted(self.rules.items(), key=lambda r: -r[1][1])
+        for name, (calls, seconds) in rules:
+            if calls:
+                s.append('%8d %10.4f  %s' % (calls, seconds, name))
+        s.append('tokens: (%.4f seconds)' % self.lexing)
+        s.append('%8s  %s' % ('count', 'type'))
+        tokens = sorted(self.tokens.items(), key=lambda t: -t[1])
+        for type, count in tokens:
+            s.append('%8d  %s' % (count, type))
+        return '\n'.join(s)
+
+    def json(self):
+        import json
+        rules = {}
+        for name, (calls, seconds) in self.rules.items():
+            if calls:
+                rules[name] = dict(calls=calls, seconds=seconds)
+        d = dict(rules=rules, tokens=self.tokens, lexing=self.lexing)
+        return json.dumps(d, indent=2, sort_keys=True)
+
+
+class Counted:
+    """
+    A lexer filter that counts (and times) the tokens produced
+    by the lexer for the profile.
+    @ivar lexer: The wrapped lexer.
+    @ivar profile: The profile.
+    @type profile: L{Profile}
+    """
+
+    def __init__(self, lexer, profile):
+        self.lexer = lexer
+        self.profile = profile
+
+    def __getattr__(self, name):
+        return getattr(self.lexer, name)
+
+    def input(self, data):
+        self.lexer.input(data)
+
+    def token(self):
+        started = time.time()
+        t = self.lexer.token()
+        profile = self.profile
+        profile.lexing += time.time()-started
+        if t is not None:
+            tokens = profile.tokens
+            tokens[t.type] = tokens.get(t.type, 0) + 1
+        return t
 
 
 #######################################################
 # Parse()
 #######################################################
 
-def parse(input, optimized=0):
-    lexer = lex.lex(optimize=optimized)
-    parser = yacc.yacc(start='script', optimize=optimized)
-    return parser.parse(input, lexer=lexer)
+class Parser:
+    """
+    The process-wide lexer & parser.  The lexers and the LALR
+    tables are built once; each parse() uses a fresh clone of the
+    lexer so that line numbers and states start clean.
+    @cvar instance: The singleton.
+    @type instance: L{Parser}
+    @cvar lexers: The supported lexer engines.  The first is the default.
+    @type lexers: tuple
+    @cvar maxerrors: The number of lexer errors (per parse) after
+        which parsing is aborted.
+    @type maxerrors: int
+    @cvar profile: The (optional) profile.  Must be installed before
+        the parser is created.
+    @type profile: L{Profile}
+    """
+
+    instance = None
+
+    lexers = ('scanner', 'ply')
+
+    maxerrors = 100
+
+    profile = None
+
+    @classmethod
+    def get(cls, optimized=0):
+        if cls.instance is None:
+            cls.instance = cls(optimized)
+        return cls.instance
+
+    def __init__(self, optimized=0):
+        self.engines = {}
+        self.parser = Tables().load(optimized)
+        if self.profile is not None:
+            self.profile.instrument(self.parser)
+
+    def lexer(self, engine=None, lineno=1):
+        """ get a (fresh) lexer using the specified engine """
+        if engine is None:
+            engine = self.lexers[0]
+        lexer = self.engines.get(engine)
+        if lexer is None:
+            if engine == 'scanner':
+                lexer = Scanner(keywords, t_error)
+            elif engine == 'ply':
+                lexer = lex.lex()
+            else:
+                raise Exception('lexer "%s", not-supported' % engine)
+            self.engines[engine] = lexer
+        lexer = lexer.clone()
+        lexer.lineno = lineno
+        return lexer
+
+    def parse(self, input, engine=None, lineno=1):
+        return self.checked(input, engine, lineno)[0]
+
+    def checked(self, input, engine=None, lineno=1):
+        """
+        Parse the input and count the errors reported (and skipped)
+        by the lexer.
+        @return: (script, errors)
+        @rtype: tuple
+        """
+        lexer = self.lexer(engine, lineno)
+        reporter = lexer
+        if self.profile is not None:
+            lexer = self.profile.lexer(lexer)
+        lexer = Inserts(lexer)
+        if engine == 'ply' and not isinstance(input, basestring):
+            input = input[:]
+        script = self.parser.parse(input, lexer=lexer)
+        return (script, getattr(reporter, 'errors', 0))
+
+    def cached(self, input, engine=None, cache=None):
+        """
+        Parse the script one statement at a time using the
+        statement cache.  Only new (or changed) statements are parsed.
+        """
+        script = []
+        for lineno, statement in Splitter(reader(input)):
+            script += self.statement(statement, engine, lineno, cache)
+        return script
+
+    def statement(self, statement, engine=None, lineno=1, cache=None):
+        """
+        Parse a single statement using the (optional) statement cache.
+        Statements with lexer errors are not cached so the errors are
+        reported by every run.
+        """
+        if cache is None:
+            return self.parse(statement, engine, lineno)
+        key = cache.key(statement)
+        script = cache.get(key)
+        if script is None:
+            script, errors = self.checked(statement, engine, lineno)
+            if not errors:
+                cache.put(key, script)
+        return script
+
+
+def mapped(fp):
+    """
+    Map the open file (fp) into memory (read-only) so it can be
+    parsed without reading it into a string.  Falls back to reading
+    the file when it cannot be mapped (empty files, pipes).
+    @return: An mmap or the file content.
+    """
+    try:
+        return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, EnvironmentError):
+        return fp.read()
+
+
+def reader(input):
+    """ get a file-like object for reading the input (string or mmap) """
+    if isinstance(input, basestring):
+        return StringIO(input)
+    input.seek(0)
+    return input
+
+
+def parse(input, optimized=0, lexer=None, cache=None):
+    parser = Parser.get(optimized)
+    if cache is None:
+        return parser.parse(input, lexer)
+    else:
+        return parser.cached(input, lexer, cache)
+
+
+def stream(fp, optimized=0, lexer=None, cache=None):
+    """
+    Parse the script read from the open file (fp) one statement
+    at a time, yielding each model object as it is parsed.
+    """
+    parser = Parser.get(optimized)
+    for lineno, statement in Splitter(fp):
+        for x in parser.statement(statement, lexer, lineno, cache):
+            yield x
+
+
+#######################################################
+# Parallel
+#######################################################
+
+class Workers:
+    """
+    Parses a script using a pool of worker processes.  The script
+    is split at top-level semicolons (see L{Splitter}) and the
+    statements are sent to the workers in batches.  Each worker
+    holds its own (warm) L{Parser} and returns the model objects
+    which are stitched back together in their original order.
+    @cvar instance: The singleton.
+    @type instance: L{Workers}
+    @cvar batch: The (approximate) number of characters per batch.
+    @type batch: int
+    """
+
+    instance = None
+
+    batch = 0x40000
+
+    @classmethod
+    def get(cls, jobs=None, optimized=0):
+        if cls.instance is None:
+            cls.instance = cls(jobs, optimized)
+        return cls.instance
+
+    def __init__(self, jobs=None, optimized=0):
+        self.optimized = optimized
+        import multiprocessing
+        self.pool = multiprocessing.Pool(jobs, Parser.get, (optimized,))
+
+    def batches(self, statements, lexer=None):
+        batch = []
+        size = 0
+        for index, lineno, statement in statements:
+            batch.append((index, lineno, statement))
+            size += len(statement)
+            if size >= self.batch:
+                yield (self.optimized, lexer, batch)
+                batch = []
+                size = 0
+        if batch:
+            yield (self.optimized, lexer, batch)
+
+    def parse(self, input, lexer=None, cache=None):
+        """
+        Parse the script.  Statements found in the (optional)
+        statement cache are not sent to the workers.  Statements
+        with lexer errors are not cached.
+        """
+        results = []
+        missed = []
+        keys = {}
+        for lineno, statement in Splitter(reader(input)):
+            index = len(results)
+            script = None
+            if cache is not None:
+                key = cache.key(statement)
+                keys[index] = key
+                script = cache.get(key)
+            if script is None:
+                missed.append((index, lineno, statement))
+            results.append(script)
+        for parsed in self.pool.imap(work, self.batches(missed, lexer)):
+            for index, script, errors in parsed:
+                results[index] = script
+                if cache is not None and not errors:
+                    cache.put(keys[index], script)
+        script = []
+        for result in results:
+            script += result
+        return script
+
+
+def work(batch):
+    """ parse a batch of statements (in a worker process) """
+    optimized, lexer, statements = batch
+    parser = Parser.get(optimized)
+    result = []
+    for index, lineno, statement in statements:
+        script, errors = parser.checked(statement, lexer, lineno)
+        result.append((index, script, errors))
+    return result
+
 
+def parallel(input, optimized=0, lexer=None, jobs=None, cache=None):
+    parser = Workers.get(jobs, optimized)
+    return parser.parse(input, lexer, cache)
@@ -53,44 +53,86 @@ class EmptyPlugin(Plugin):
 
 
 class PluginFactory:
-    
+    """
+    The plugins (renderers) of a style.  The plugin and the (sort)
+    rank of each class are resolved through its MRO (the nearest
+    registered class) the first time the class is seen and kept in
+    dispatch tables so that later lookups are a dictionary lookup.
+    Plugins must be registered before the first lookup.
+    @ivar ordering: The classes in (sort) order.
+    @type ordering: list
+    @ivar plugins: The registered plugins: {class:plugin}
+    @type plugins: dict
+    @ivar dispatch: The plugin of each class seen: {class:plugin}
+    @type dispatch: dict
+    @ivar ranks: The rank of each class seen: {class:rank}
+    @type ranks: dict
+    """
+
     def __init__(self):
         self.ordering = []
         self.plugins = {}
         self.options = {}
+        self.dispatch = {}
+        self.ranks = {}
+        self.ordered = None
 
     def get(self, object):
         try:
-            return self.plugins[object.__class__]
-        except:
-            msg = 'plugin for %s, not-found' % object.__class__
-            raise Exception(msg)
-        
+            return self.dispatch[object.__class__]
+        except KeyError:
+            return self.resolve(object.__class__)
+
     def sorted(self, collection):
-        return sorted(collection, self.cmpfn)
-    
+        """ get the collection (stable) sorted by the rank of each class """
+        if len(collection) < 2:
+            return list(collection)
+        ranks = self.ranks
+        key = ( lambda x: ranks[x.__class__] )
+        try:
+            return sorted(collection, key=key)
+        except KeyError:
+            for x in collection:
+                if x.__class__ not in ranks:
+                    self.rank(x.__class__)
+            return sorted(collection, key=key)
+
     def xlated(self, s):
         return s
-    
-    def index(self, x):
-        try:
-            return self.ordering.index(x)
-        except:
-            msg = 'factory missing ordering for %s' % x.__name__
-            raise Exception(msg)
-
-    def cmpfn(self, a, b):
-        myindex = self.index(a.__class__)
-        otherindex = self.index(b.__class__)
-        if myindex < otherindex:
-            return -1
-        else:
-            return 1
+
+    def resolve(self, cls):
+        """ get (and keep) the plugin of the nearest registered class """
+        for c in cls.__mro__:
+            plugin = self.plugins.get(c)
+            if plugin is not None:
+                self.dispatch[cls] = plugin
+                return plugin
+        msg = 'plugin for %s, not-found' % cls
+        raise Exception(msg)
+
+    def rank(self, cls):
+        """
+        Get (and keep) the rank (position in the ordering) of the
+        nearest ordered class.
+        """
+        if self.ordered is None:
+            self.ordered = {}
+            for n, c in enumerate(self.ordering):
+                self.ordered.setdefault(c, n)
+        for c in cls.__mro__:
+            n = self.ordered.get(c)
+            if n is not None:
+                self.ranks[cls] = n
+                return n
+        msg = 'factory missing ordering for %s' % cls.__name__
+        raise Exception(msg)
         
         
 class BaseModel(Plugin):
 
     def render(self, model, n=0):
+        if model.waves:
+            return self.waves(model)
         s = []
         if self.option('sort', False):
             content = self.factory.sorted(model.content)
@@ -99,4 +141,16 @@ class BaseModel(Plugin):
         for t in content:
             p = self.plugin(t)
             s.append(p.render(t))
-        return '\n\n'.join(s)
\ No newline at end of file
+        return '\n\n'.join(s)
+
+    def waves(self, model):
+        """ render the content by (labeled) deployment waves """
+        s = []
+        for label, content in model.waves:
+            w = []
+            w.append('-- %s' % label)
+            for t in content:
+                p = self.plugin(t)
+                w.append(p.render(t))
+            s.append('\n\n'.join(w))
+        return '\n\n'.join(s)
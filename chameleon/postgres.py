@@ -47,7 +47,7 @@ class _FkMod(FkMod):
 class Type(Plugin):
     
     def xlated(self, t):
-        tn = t.name.upper()
+        tn = model.key(t.name)
         if tn == 'VARCHAR2':
             if t.precision is None:
                 return model.Type('TEXT')
@@ -78,7 +78,7 @@ class Type(Plugin):
     def render(self, type, n=0):
         t = self.xlated(type)
         s = []
-        s.append(t.name.upper())
+        s.append(model.key(t.name))
         if t.precision is not None:
             s.append('(')
             s.append(str(t.precision))
@@ -86,6 +86,69 @@ class Type(Plugin):
         return self.join(s)
     
 
+class Modify(Plugin):
+    """
+    Renders MODIFY as the ALTER COLUMN (and ADD constraint) actions
+    of the columns: PostgreSQL has no MODIFY.
+    """
+
+    def render(self, mod, n=0):
+        s = []
+        for c in mod.columns:
+            for m in self.sorted(c.modifiers):
+                action = self.action(c, m, n)
+                if not action:
+                    continue
+                s.append('\n')
+                s.append(indent(n))
+                s.append(action)
+                s.append(',')
+        if s:
+            s.pop()
+        return self.join(s)
+
+    def action(self, c, m, n):
+        if isinstance(m, model.Type):
+            p = self.plugin(m)
+            return 'ALTER COLUMN %s TYPE %s' % (c.name, p.render(m, n))
+        if isinstance(m, model.Default):
+            return 'ALTER COLUMN %s %s' % (c.name, self.default(m, n))
+        if isinstance(m, model.NotNull):
+            return 'ALTER COLUMN %s SET NOT NULL' % c.name
+        if isinstance(m, model.Constraint):
+            return 'ADD %s' % self.constraint(c, m, n).lstrip()
+        p = self.plugin(m)
+        return p.render(m, n)
+
+    def default(self, d, n):
+        v = self.xlated(d.value)
+        if isinstance(v, str):
+            if model.key(v) == 'NULL':
+                return 'DROP DEFAULT'
+        else:
+            p = self.plugin(v)
+            v = p.render(v, n)
+        return 'SET DEFAULT (%s)' % v
+
+    def constraint(self, c, m, n):
+        """ get the (table) constraint of a column constraint """
+        if isinstance(m, model.FK):
+            s = []
+            if m.named():
+                s.append('CONSTRAINT %s ' % m.name)
+            s.append('FOREIGN KEY (%s)' % c.name)
+            fk = model.FkMod()
+            fk.refB = m.refB
+            fk.ondelete = m.ondelete
+            p = self.plugin(fk)
+            s.append(p.render(fk, n))
+            return self.join(s)
+        p = self.plugin(m)
+        if isinstance(m, (model.PK, model.Unique)):
+            return '%s (%s)' % (p.render(m, n), c.name)
+        return p.render(m, n)
+
+
 class Include(Plugin):
         
     def render(self, x, n=0):
@@ -108,6 +171,7 @@ class Factory(OraPgFactory):
             model.Synonym : EmptyPlugin(self),
             model.Sequence.Order : EmptyPlugin(self),
             model.Include : Include(self),
+            model.Modify : Modify(self),
         }
         self.plugins.update(plugins)
         self.translator = Translator()
@@ -132,7 +196,7 @@ class Translator:
             return "'%s'" % content
         if s.endswith('.nextval'):
             return "nextval('%s')" % s[0:s.index('.')]
-        return self.xtab.get(s.upper(), s)
+        return self.xtab.get(model.key(s), s)
     
     def dquoted(self, s):
         return ( s[0] == '"' and s[-1] == '"' )
@@ -0,0 +1,251 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+from ply.lex import LexToken
+from chameleon import model
+import re
+
+
+class Scanner:
+    """
+    A PLY compatible lexer that emits the same token stream as the
+    PLY rules in L{chameleon.parser} using one combined pattern.
+    Whitespace, newlines and SQL comments are consumed in a single
+    match and line numbers are tracked by counting newlines in
+    the consumed text.  C comments are skipped with a single find().
+    Reserved words are resolved using a dictionary and identifiers
+    are interned (see L{model.identifier}).
+    Quoted literals are scanned with find() (see L{squoted}).
+    The input may be a string or an mmap.  Token values are sliced
+    from the input only when used (see L{Token}).
+    @ivar reserved: Reserved words: {upper-cased:type}
+    @type reserved: dict
+    @ivar errorf: The error function: errorf(token).
+    @type errorf: callable
+    @ivar types: Resolved identifiers: {spelling:(value,type)}
+    @type types: dict
+    """
+
+    pattern = re.compile(r"""
+        (?P<space>(?:[ \t\r\n]+|(?:--|\#)[^\n]*)+)
+        |(?P<SQUOTED>'[^']*')
+        |(?P<DQUOTED>"[^"]*")
+        |(?P<STARTCOMMENT>/\*)
+        |(?P<MACRO>\[\[.+\]\])
+        |(?P<IDENTIFIER>[a-zA-Z][.a-zA-Z_0-9]*)
+        |(?P<INCLUDE>(?:@|\\i\s+)[^\r\n]+)
+        |(?P<DIGITS>-?[0-9]+)
+        |(?P<LPAREN>\()
+        |(?P<RPAREN>\))
+        |(?P<SEMICOLON>;)
+        |(?P<COMMA>,)
+        |(?P<NEQ>!=)
+        |(?P<GTEQ>>=)
+        |(?P<LTEQ><=)
+        |(?P<EQ>=)
+        |(?P<GT>>)
+        |(?P<LT><)
+        |(?P<PLUS>\+)
+        |(?P<MINUS>-)
+        """, re.VERBOSE)
+
+    def __init__(self, keywords, errorf):
+        self.reserved = {}
+        for k in keywords:
+            self.reserved[k] = k
+        self.errorf = errorf
+        self.types = {}
+        self.lineno = 1
+        self.input('')
+
+    def input(self, data):
+        """
+        Set the input.  As with the PLY lexer, the line number is not
+        reset so that a statement parsed on its own (see
+        L{chameleon.parser.Parser.lexer}) keeps its line in the file.
+        """
+        self.lexdata = data
+        self.lexpos = 0
+        self.lexlen = len(data)
+
+    def clone(self):
+        lexer = Scanner((), self.errorf)
+        lexer.reserved = self.reserved
+        lexer.types = self.types
+        lexer.input(self.lexdata)
+        lexer.lineno = self.lineno
+        return lexer
+
+    def skip(self, n):
+        self.lexpos += n
+
+    def token(self):
+        data = self.lexdata
+        match = self.pattern.match
+        while self.lexpos < self.lexlen:
+            pos = self.lexpos
+            m = match(data, pos)
+            if m is None:
+                self.error(pos)
+                continue
+            kind = m.lastgroup
+            end = m.end()
+            if kind == 'SQUOTED':
+                end = squoted(data, end)
+            self.lexpos = end
+            if kind == 'space':
+                self.lineno += self.newlines(pos, end)
+                continue
+            if kind == 'STARTCOMMENT':
+                self.comment(end)
+                continue
+            if kind == 'IDENTIFIER':
+                t = LexToken()
+                t.value, t.type = self.identifier(data[pos:end])
+            elif kind == 'MACRO':
+                t = LexToken()
+                t.value = intern(data[pos:end])
+                t.type = kind
+            elif kind == 'INCLUDE':
+                t = LexToken()
+                t.value = self.include(data[pos:end])
+                t.type = kind
+            else:
+                t = Token()
+                t.data = data
+                t.end = end
+                t.type = kind
+            t.lineno = self.lineno
+            t.lexpos = pos
+            return t
+        return None
+
+    def identifier(self, value):
+        """
+        Resolve an identifier (or reserved word).
+        @return: The (interned) value and the token type.
+        @rtype: tuple
+        """
+        resolved = self.types.get(value)
+        if resolved is None:
+            value = model.identifier(value)
+            type = self.reserved.get(model.key(value), 'IDENTIFIER')
+            resolved = (value, type)
+            self.types[value] = resolved
+        return resolved
+
+    def include(self, value):
+        if value[0] == '@':
+            return value[1:]
+        else:
+            return value.split(' ',1)[1]
+
+    def comment(self, pos):
+        """ skip a C comment body starting at pos """
+        data = self.lexdata
+        end = data.find('*/', pos)
+        if end < 0:
+            end = self.lexlen
+        else:
+            end += 2
+        self.lineno += self.newlines(pos, end)
+        self.lexpos = end
+
+    def newlines(self, pos, end):
+        """ count the newlines in the input between pos and end """
+        data = self.lexdata
+        if isinstance(data, basestring):
+            return data.count('\n', pos, end)
+        n = 0
+        while pos < end:
+            chunk = min(end, pos+0x100000)
+            n += data[pos:chunk].count('\n')
+            pos = chunk
+        return n
+
+    def error(self, pos):
+        t = LexToken()
+        t.type = 'error'
+        t.value = self.lexdata[pos:pos+1]
+        t.lineno = self.lineno
+        t.lexpos = pos
+        t.lexer = self
+        self.errorf(t)
+        if self.lexpos == pos:
+            raise Exception('illegal character "%s"' % t.value[0])
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        t = self.token()
+        if t is None:
+            raise StopIteration
+        return t
+
+    __next__ = next
+
+
+# a run of quotes
+QUOTES = re.compile("'*")
+
+# a run of quotes having an odd length
+ODDQUOTES = re.compile("'(?<!'')(?:'')*(?!')")
+
+def squoted(data, end):
+    """
+    Find the end of a single quoted literal containing '' escapes.
+    The literal has been matched through its first closing quote,
+    which ends at (end).  The literal ends after the first run of
+    quotes having an odd length: the pairs are escapes and the last
+    quote closes it.  The longest terminated literal is used, as with
+    the regex '([^']|'')*' but without a python loop per escape or
+    the backtracking state that regex keeps per character.
+    @param data: The input.
+    @type data: str
+    @param end: The index following the first closing quote.
+    @type end: int
+    @return: The index following the literal.
+    @rtype: int
+    """
+    if data[end:end+1] != "'":
+        return end
+    run = QUOTES.match(data, end).end()
+    if not (run-end) % 2:
+        return run
+    match = ODDQUOTES.search(data, run)
+    if match is None:
+        return data.rfind("'")
+    return match.end()
+
+
+class Token(LexToken):
+    """
+    A token whose value is sliced from the input on first use.
+    Most keyword and punctuation values are never used by the
+    grammar actions.
+    """
+
+    text = None
+
+    def getvalue(self):
+        if self.text is None:
+            self.text = self.data[self.lexpos:self.end]
+        return self.text
+
+    def setvalue(self, value):
+        self.text = value
+
+    value = property(getvalue, setvalue)
@@ -0,0 +1,110 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+import os
+import gc
+import zlib
+import cPickle as pickle
+
+
+class Snapshot:
+    """
+    A parsed (and optimized) model saved to a file so that it can be
+    loaded, much faster than the script is parsed, by later runs.
+    The file is a header line (magic and version) followed by the
+    compressed pickle of the content, the name of the optimizer and
+    the warnings it reported.  Snapshots of another version are
+    not loaded.
+    @ivar content: The model content (statements).
+    @type content: list
+    @ivar optimizer: The optimizer (class) name.
+    @type optimizer: str
+    @ivar warnings: The optimizer warnings: [(type,args),]
+    @type warnings: list
+    """
+
+    magic = 'chameleon-snapshot'
+
+    version = 1
+
+    @classmethod
+    def test(cls, path):
+        """ get whether the file is a snapshot """
+        try:
+            f = open(path, 'rb')
+            try:
+                return ( f.read(len(cls.magic)) == cls.magic )
+            finally:
+                f.close()
+        except IOError:
+            return False
+
+    @classmethod
+    def load(cls, path):
+        f = open(path, 'rb')
+        try:
+            header = f.readline().split()
+            data = f.read()
+        finally:
+            f.close()
+        if len(header) != 2 or header[0] != cls.magic:
+            raise Exception('snapshot "%s", not-valid' % path)
+        if header[1] != str(cls.version):
+            raise Exception(
+                'snapshot "%s", version %s not-supported' % (path, header[1]))
+        data = zlib.decompress(data)
+        #
+        # the collector would otherwise run many times while the
+        # (acyclic) objects are created, roughly doubling the time.
+        #
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            content, optimizer, warnings = pickle.loads(data)
+        finally:
+            if enabled:
+                gc.enable()
+        return cls(content, optimizer, warnings)
+
+    def __init__(self, content, optimizer='Optimizer', warnings=()):
+        self.content = list(content)
+        self.optimizer = optimizer
+        self.warnings = list(warnings)
+
+    def save(self, path):
+        """
+        Save the snapshot.  The file is written to a private file
+        and renamed into place so readers never see a partial file.
+        """
+        state = (self.content, self.optimizer, self.warnings)
+        #
+        # the collector would otherwise run many times while the
+        # pickler allocates the state of each object (see load).
+        #
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            data = pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+        finally:
+            if enabled:
+                gc.enable()
+        tmp = '%s.%d.tmp' % (path, os.getpid())
+        f = open(tmp, 'wb')
+        try:
+            f.write('%s %d\n' % (self.magic, self.version))
+            f.write(zlib.compress(data, 1))
+        finally:
+            f.close()
+        os.rename(tmp, path)
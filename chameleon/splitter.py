@@ -0,0 +1,162 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+import re
+
+
+class Splitter:
+    """
+    Splits a script read from a file object into statements at the
+    top-level semicolons.  Semicolons inside quoted (SQUOTED|DQUOTED)
+    literals, comments, includes and macros are not boundaries.
+    The script is read in chunks so memory is bounded by the
+    largest statement.  Iterating yields (lineno, statement) where
+    lineno is the line on which the statement text starts.
+    Blank (whitespace and comment only) statements are not yielded.
+    @ivar fp: The open file.
+    @type fp: file
+    @ivar size: The read (chunk) size.
+    @type size: int
+    """
+
+    special = re.compile(r"""[;'"/\-#@\\\[]""")
+    nonblank = re.compile(r'\S')
+    include = re.compile(r'\\i\s+[^\n]*')
+
+    def __init__(self, fp, size=0x10000):
+        self.fp = fp
+        self.size = size
+        self.buf = ''
+        self.eof = False
+
+    def read(self):
+        """
+        Read the next chunk.  Reads grow with the buffer so that
+        a huge statement is not re-copied once per chunk.
+        @return: False when at EOF.
+        @rtype: bool
+        """
+        if self.eof:
+            return False
+        size = max(self.size, len(self.buf))
+        chunk = self.fp.read(size)
+        if chunk:
+            self.buf += chunk
+            return True
+        self.eof = True
+        return False
+
+    def __iter__(self):
+        lineno = 1
+        start = 0
+        pos = 0
+        content = False
+        while True:
+            buf = self.buf
+            m = self.special.search(buf, pos)
+            if m is None:
+                if not content and self.nonblank.search(buf, pos):
+                    content = True
+                self.buf = buf[start:]
+                pos = len(self.buf)
+                start = 0
+                if self.read():
+                    continue
+                break
+            i = m.start()
+            if not content and self.nonblank.search(buf, pos, i):
+                content = True
+            end = self.skip(m.group(), i)
+            if end is None:
+                self.buf = buf[start:]
+                pos = i - start
+                start = 0
+                self.read()
+                continue
+            if end:
+                if buf[i] not in '-/#' or end - i == 1:
+                    content = True
+                pos = end
+                continue
+            if content:
+                statement = buf[start:i+1]
+                yield (lineno, statement)
+                lineno += statement.count('\n')
+            else:
+                lineno += buf.count('\n', start, i+1)
+            content = False
+            start = i+1
+            pos = start
+        if content:
+            yield (lineno, self.buf[start:])
+
+    def skip(self, c, i):
+        """
+        Skip the construct starting with character (c) at index (i).
+        @return: The index following the construct; 0 when (c) is a
+            top-level semicolon; None when more input is needed.
+        @rtype: int
+        """
+        buf = self.buf
+        if c == ';':
+            return 0
+        if c in '\'"':
+            j = buf.find(c, i+1)
+            if j < 0:
+                return self.more()
+            return j+1
+        if i+2 >= len(buf) and not self.eof:
+            return None
+        nc = buf[i+1:i+2]
+        if c == '/' and nc == '*':
+            j = buf.find('*/', i+2)
+            if j < 0:
+                return self.more()
+            return j+2
+        if (c == '-' and nc == '-') or c in '#@':
+            return self.eol(i)
+        if c == '\\' and nc == 'i':
+            m = self.include.match(buf, i)
+            if m is None:
+                return i+1
+            if m.end() == len(buf):
+                return self.more()
+            return m.end()
+        if c == '[' and nc == '[':
+            j = self.eol(i)
+            if j is None:
+                return None
+            k = buf.rfind(']]', i+2, j)
+            if k < 0:
+                return i+1
+            return k+2
+        return i+1
+
+    def eol(self, i):
+        """ get the index of the end of the line containing index (i) """
+        j = self.buf.find('\n', i)
+        if j < 0:
+            return self.more()
+        return j
+
+    def more(self):
+        """
+        The construct being skipped is incomplete.
+        @return: None when more input is needed, else the end of the buffer.
+        @rtype: int
+        """
+        if self.eof:
+            return len(self.buf)
+        return None
@@ -11,4 +11,5 @@ setup(
     maintainer="Jeff Ortel",
     maintainer_email="jortel@redhat.com",
     packages=find_packages(),
+    package_data={'chameleon': ['parsetab-*.pickle']},
 )
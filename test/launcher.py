@@ -0,0 +1,51 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# Runs chameleon (chameleon.bin) for the tests that check its
+# command line behavior.
+#
+
+import os
+import sys
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLES = os.path.join(ROOT, 'samples')
+
+
+def chameleon(arguments, tmp, cache='cache'):
+    """
+    Run chameleon in the (tmp) directory using the statement cache
+    in its (cache) subdirectory.
+    @param arguments: The command line arguments.
+    @type arguments: list
+    @return: The output (stdout and stderr).
+    @rtype: str
+    """
+    env = dict(os.environ)
+    path = [ROOT] + filter(None, [env.get('PYTHONPATH')])
+    env['PYTHONPATH'] = os.pathsep.join(path)
+    env['CHAMELEON_CACHE'] = os.path.join(tmp, cache)
+    command = [sys.executable, os.path.join(ROOT, 'chameleon.bin')]
+    command += arguments
+    p = subprocess.Popen(
+        command,
+        cwd=tmp,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT)
+    return p.communicate()[0]
@@ -0,0 +1,155 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# The diff compares two schemas and builds the statements that
+# change the old schema into the new one.
+#
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from launcher import chameleon
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from chameleon.parser import Parser
+from chameleon.model import *
+from chameleon.diff import Differ
+from chameleon.postgres import Model as Postgres
+
+
+def model(script):
+    return Model(Parser.get().parse(script))
+
+def diff(old, new):
+    """ get the differ and the diff of the (old) and (new) scripts """
+    differ = Differ(model(old), model(new))
+    return differ, differ.diff()
+
+def kinds(model):
+    """ get the class names of the model content """
+    return [c.__class__.__name__ for c in model.content]
+
+
+class Diff(unittest.TestCase):
+
+    def test_rename(self):
+        differ, result = diff(
+            'create table a (id integer, name varchar2(40));\n',
+            'create table b (id integer, name varchar2(40));\n'
+            'create table c (id integer, label varchar2(40));\n')
+        self.assertEqual(kinds(result), ['Table', 'Table'])
+        rename = result.content[0].mods[0].object
+        self.assertEqual((rename.name, rename.newname), ('a', 'b'))
+        self.assertEqual(result.content[1].name, 'c')
+        differ, result = diff(
+            'create table a (id integer, name varchar2(40));\n',
+            'create table a (id integer, label varchar2(40));\n')
+        self.assertEqual(kinds(result), ['Table'])
+        rename = result.content[0].mods[0].object
+        self.assertEqual((rename.name, rename.newname), ('name', 'label'))
+        self.assertEqual(differ.columnmap, {'A': {'NAME': 'LABEL'}})
+
+    def test_modify(self):
+        differ, result = diff(
+            'create table a (id integer, x number(10) not null, y number);\n',
+            'create table a (id integer, x number(5), y number default 0 not null);\n')
+        self.assertEqual(kinds(result), ['Table'])
+        x, y = result.content[0].mods[0].columns
+        self.assertEqual([m.__class__ for m in x.modifiers], [Type])
+        self.assertEqual(x.modifiers[0].precision, '5')
+        self.assertEqual([m.__class__ for m in y.modifiers], [Default, NotNull])
+        self.assertEqual(differ.skipped, ['NOT NULL on "a.x", not dropped'])
+
+    def test_modify_postgres(self):
+        differ, result = diff(
+            'create table a (x number(10), y varchar2(10) default 0);\n',
+            'create table a (x number(5) default 1 not null, y varchar2(10));\n')
+        self.assertEqual(Postgres().render(result).strip(),
+            'ALTER TABLE a\n'
+            '    ALTER COLUMN x TYPE SMALLINT,\n'
+            '    ALTER COLUMN x SET DEFAULT (1),\n'
+            '    ALTER COLUMN x SET NOT NULL,\n'
+            '    ALTER COLUMN y DROP DEFAULT;')
+
+    def test_constraint(self):
+        differ, result = diff(
+            'create table a (id integer constraint a_pk primary key,'
+            ' n integer check (n > 0));\n'
+            'create table b (id integer, a_id integer,'
+            ' constraint b_fk foreign key (a_id) references a (id));\n',
+            'create table a (id integer constraint a_pk primary key,'
+            ' n integer check (n > 1));\n'
+            'create table b (id integer, a_id integer,'
+            ' constraint b_fk2 foreign key (a_id) references a (id));\n')
+        self.assertEqual(kinds(result), ['Table', 'Table', 'Table'])
+        drop, add, fk = result.content
+        self.assertEqual(drop.drops[0].object.name, 'b_fk')
+        self.assertEqual(add.adds[0].__class__, CkMod)
+        self.assertEqual(add.adds[0].name, 'a_n_ck')
+        self.assertEqual(fk.adds[0].name, 'b_fk2')
+        self.assertEqual(differ.skipped,
+            ['anonymous (ck) constraint on "a", not dropped'])
+
+    def test_constraint_renamed(self):
+        differ, result = diff(
+            'create table a (id integer, n integer,'
+            ' constraint a_uq unique (n));\n',
+            'create table a (id integer, m integer,'
+            ' constraint a_uq unique (m));\n')
+        self.assertEqual(kinds(result), ['Table'])
+        self.assertEqual(differ.skipped, [])
+
+    def test_index(self):
+        differ, result = diff(
+            'create table a (id integer, n integer, m integer);\n'
+            'create index a_n on a (n);\n'
+            'create index a_m on a (m);\n'
+            'create index a_x on a (id);\n',
+            'create table a (id integer, k integer, m integer);\n'
+            'create index a_n on a (k);\n'
+            'create unique index a_m on a (m);\n'
+            'create index a_y on a (id);\n')
+        self.assertEqual(kinds(result),
+            ['Table', 'Drop', 'Drop', 'Index', 'Index'])
+        self.assertEqual(
+            [c.object.name for c in result.content[1:3]], ['a_x', 'a_m'])
+        self.assertEqual(
+            [c.name for c in result.content[3:]], ['a_y', 'a_m'])
+
+    def test_skipped(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            files = []
+            for fn, check in (('old.sql', 'n > 0'), ('new.sql', 'n > 1')):
+                path = os.path.join(tmp, fn)
+                f = open(path, 'w')
+                f.write('create table a (n integer check (%s));\n' % check)
+                f.close()
+                files.append(path)
+            output = chameleon(['diff', '-s', 'postgres'] + files, tmp)
+        finally:
+            shutil.rmtree(tmp)
+        self.assertTrue(
+            '-- skipped: anonymous (ck) constraint on "a", not dropped'
+            in output.splitlines(), output)
+
+
+if __name__ == '__main__':
+    unittest.main()
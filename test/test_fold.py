@@ -0,0 +1,117 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# Folding (--fold) applies the ALTER and DROP statements of an
+# upgrade history to the objects they change.
+#
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from chameleon.parser import Parser
+from chameleon.model import *
+from chameleon.fold import Folder
+
+
+def fold(script):
+    """ get the folded model of the script """
+    return Folder(Model(Parser.get().parse(script))).fold()
+
+def kinds(model):
+    """ get the class names of the model content """
+    return [c.__class__.__name__ for c in model.content]
+
+def names(nodes):
+    return [n.name for n in nodes]
+
+
+class Fold(unittest.TestCase):
+
+    def test_rename(self):
+        model = fold(
+            'create table a (id integer primary key);\n'
+            'create table b (id integer, a_id integer references a (id));\n'
+            'create index b_ix on b (a_id);\n'
+            "comment on column b.a_id is 'text';\n"
+            'insert into b (id, a_id) values (1, 1);\n'
+            'alter table a rename column id to a_key;\n'
+            'alter table b rename column a_id to ref_id;\n'
+            'alter table b rename to c;\n')
+        self.assertEqual(kinds(model),
+            ['Table', 'Table', 'Index', 'ColumnComment', 'Insert'])
+        a, c, index, comment, insert = model.content
+        self.assertEqual(names(a.columns), ['a_key'])
+        self.assertEqual(c.name, 'c')
+        self.assertEqual(names(c.columns), ['id', 'ref_id'])
+        fk = list(c.columns[1].references())[0]
+        self.assertEqual(fk.refB.columns, ['a_key'])
+        self.assertEqual((index.table, index.columns), ('c', ['ref_id']))
+        self.assertEqual((comment.table, comment.column), ('c', 'ref_id'))
+        self.assertEqual((insert.table, insert.columns), ('c', ['id', 'ref_id']))
+
+    def test_drop(self):
+        model = fold(
+            'create table b (id integer, a_id integer, y integer);\n'
+            'create index b_ix on b (a_id);\n'
+            "comment on column b.a_id is 'dropped';\n"
+            "comment on column b.y is 'kept';\n"
+            'insert into b (id, a_id, y) values (1, 2, 3);\n'
+            'alter table b rename column y to z;\n'
+            'alter table b drop column a_id;\n')
+        self.assertEqual(kinds(model), ['Table', 'ColumnComment', 'Insert'])
+        table, comment, insert = model.content
+        self.assertEqual(names(table.columns), ['id', 'z'])
+        self.assertEqual(comment.column, 'z')
+        self.assertEqual(insert.columns, ['id', 'z'])
+        self.assertEqual(insert.values, ['1', '3'])
+
+    def test_drop_positional(self):
+        model = fold(
+            'create table b (id integer, a_id integer);\n'
+            'insert into b values (1, 2);\n'
+            'alter table b drop column a_id;\n')
+        self.assertEqual(kinds(model), ['Table', 'Insert', 'Table'])
+        self.assertEqual(names(model.content[0].columns), ['id', 'a_id'])
+
+    def test_modify(self):
+        model = fold(
+            'create table a (id integer, name varchar(10) default (1) not null);\n'
+            "alter table a modify (name varchar(40) default ('x'));\n")
+        self.assertEqual(kinds(model), ['Table'])
+        column = model.content[0].columns[1]
+        modifiers = dict((m.__class__.__name__, m) for m in column.modifiers)
+        self.assertEqual(modifiers['Type'].precision, '40')
+        self.assertEqual(modifiers['Default'].value, "'x'")
+        self.assertTrue('NotNull' in modifiers)
+
+    def test_cascade(self):
+        model = fold(
+            'create table a (id integer);\n'
+            'create index a_ix on a (id);\n'
+            "comment on table a is 'text';\n"
+            'insert into a (id) values (1);\n'
+            'create table b (id integer);\n'
+            'drop table a;\n')
+        self.assertEqual(kinds(model), ['Table'])
+        self.assertEqual(model.content[0].name, 'b')
+
+
+if __name__ == '__main__':
+    unittest.main()
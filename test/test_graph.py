@@ -0,0 +1,119 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# The tables, indexes, sequences and synonyms are grouped into waves
+# by their dependencies (--waves); other statements keep their order
+# before or after the waves.
+#
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from chameleon.parser import Parser
+from chameleon.model import *
+from chameleon.graph import Graph
+
+
+def order(script):
+    """ get the waves of the script: [(label,[statement,]),] """
+    model = Model(Parser.get().parse(script))
+    return Graph(model).order()
+
+def names(waves):
+    """ get the waves: [(label,[(class name, name),]),] """
+    result = []
+    for label, content in waves:
+        statements = []
+        for c in content:
+            kind = c.__class__.__name__
+            name = getattr(c, 'name', None)
+            if isinstance(c, Drop):
+                name = c.object.name
+            if isinstance(c, Insert):
+                name = c.table
+            if isinstance(c, Alter.Table):
+                kind = 'Alter'
+                name = c.table
+            statements.append((kind, name))
+        result.append((label, statements))
+    return result
+
+
+class Waves(unittest.TestCase):
+
+    def test_dependencies(self):
+        waves = order(
+            'create index ib on b (id);\n'
+            'create table b (id integer, a_id integer references a (id));\n'
+            'create table a (id integer primary key);\n'
+            'create sequence s;\n')
+        self.assertEqual(names(waves), [
+            ('wave 1', [('Table', 'a'), ('Sequence', 's')]),
+            ('wave 2', [('Table', 'b')]),
+            ('wave 3', [('Index', 'ib')]),
+        ])
+
+    def test_drop(self):
+        waves = order(
+            'drop table a;\n'
+            'drop index ia;\n'
+            'create table a (id integer);\n'
+            'create index ia on a (id);\n'
+            'insert into a (id) values (1);\n'
+            'drop table old;\n')
+        self.assertEqual(names(waves), [
+            ('in order, before wave 1', [('Drop', 'a'), ('Drop', 'ia')]),
+            ('wave 1', [('Table', 'a')]),
+            ('wave 2', [('Index', 'ia')]),
+            ('in order', [('Insert', 'a'), ('Drop', 'old')]),
+        ])
+
+    def test_drop_after(self):
+        waves = order(
+            'create table a (id integer);\n'
+            'insert into a (id) values (1);\n'
+            'drop table a;\n')
+        self.assertEqual(names(waves), [
+            ('wave 1', [('Table', 'a')]),
+            ('in order', [('Insert', 'a'), ('Drop', 'a')]),
+        ])
+
+    def test_cycle(self):
+        waves = order(
+            'create table a (id integer primary key, b_id integer references b (id));\n'
+            'create table b (id integer primary key, a_id integer references a (id));\n'
+            'create table c (id integer references a (id));\n')
+        self.assertEqual(names(waves), [
+            ('wave 1', [('Table', 'a'), ('Table', 'b')]),
+            ('wave 2', [('Table', 'c')]),
+            ('wave 3: deferred constraints', [('Alter', 'a'), ('Alter', 'b')]),
+        ])
+        a, b = waves[0][1]
+        for table in (a, b):
+            for column in table.columns:
+                self.assertEqual(list(column.references()), [])
+        deferred = waves[2][1]
+        self.assertEqual(
+            [(x.adds[0].refA.columns, x.adds[0].refB.table) for x in deferred],
+            [(['b_id'], 'b'), (['a_id'], 'a')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# Errors are reported at their line in the file in every parse mode,
+# including those that parse one statement at a time, and again by
+# runs that use the statement cache.
+#
+
+import os
+import shutil
+import tempfile
+import unittest
+from launcher import chameleon
+
+SCRIPT = """\
+create table a
+(
+  id integer
+);
+
+
+create table b
+(
+  id ! integer
+);
+"""
+
+MODES = (
+    [],
+    ['--stream'],
+    ['--cache'],
+    ['-j', '1'],
+    ['-j', '2'],
+)
+
+
+class LineNumbers(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.tmp, 'error.sql')
+        f = open(cls.path, 'w')
+        f.write(SCRIPT)
+        f.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp)
+
+    def chameleon(self, options, lexer, cache=None):
+        arguments = options + ['--lexer', lexer, self.path]
+        return chameleon(arguments, self.tmp, cache or lexer)
+
+    def reported(self, output):
+        for line in output.split('\n'):
+            if 'unexpected at:' in line:
+                return line.split('unexpected at:')[1].split()[0]
+        self.fail('error not reported:\n%s' % output)
+
+    def test_scanner(self):
+        for options in MODES:
+            output = self.chameleon(options, 'scanner')
+            self.assertEqual(self.reported(output), '9:6', options)
+
+    def test_ply(self):
+        for options in MODES:
+            output = self.chameleon(options, 'ply')
+            self.assertEqual(self.reported(output), '9:6', options)
+
+    def test_cached(self):
+        for lexer in ('scanner', 'ply'):
+            for options in (['--cache'], ['--cache', '-j', '1']):
+                cache = '-'.join(['twice', lexer] + options)
+                for run in (1, 2):
+                    output = self.chameleon(options, lexer, cache)
+                    self.assertEqual(
+                        self.reported(output), '9:6', (lexer, options, run))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from chameleon.macro import Macros, Template
+
+
+class Expansion(unittest.TestCase):
+
+    def test_resolved(self):
+        macros = Macros('test', {'ts':'users'})
+        template = Template('TABLESPACE [[ ts ]] and [[ts]];')
+        self.assertEqual(template.expand(macros), 'TABLESPACE users and users;')
+        self.assertEqual(macros.unresolved, {})
+
+    def test_unresolved(self):
+        macros = Macros('test', {})
+        text = 'GRANT TO [[ db_user ]], [[db_user]], [[  other\t]];'
+        self.assertEqual(Template(text).expand(macros), text)
+        self.assertEqual(macros.unresolved, {'db_user':2, 'other':1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# The scanner (default lexer) must emit the same token stream as the
+# PLY rules: (type, value, lineno, lexpos) of each token and the same
+# error reports, for the samples and for generated inputs.
+#
+
+import os
+import sys
+import glob
+import random
+import unittest
+from StringIO import StringIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from chameleon.parser import Parser
+
+#
+# Fragments of generated inputs: each token type, the characters
+# that start (or end) comments and literals, and the characters
+# the lexers do not accept.
+#
+FRAGMENTS = [
+    "'", '"', "''", ' ', '\t', '\n', '\r', '\r\n', '--', '#', '/*', '*/', '*',
+    '/', '[[', ']]', 'x', 'table', 'Create', 'a.b', '_', '@', '\\i ',
+    '\\i\n', '-', '5', '-12', '(', ')', ';', ',', '!=', '>=', '<=', '=',
+    '>', '<', '+', '!', '.', 'in', 'NULL', '\x00', '\xff',
+]
+
+GENERATED = 3000
+
+
+def samples():
+    result = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'samples', '*.sql'))):
+        f = open(path)
+        result.append((path, f.read()))
+        f.close()
+    return result
+
+
+class Conformance(unittest.TestCase):
+
+    def tokens(self, engine, data, lineno=1):
+        """
+        Get the token stream and the errors reported by the lexer.
+        @return: ([(type,value,lineno,lexpos),], reported)
+        """
+        result = []
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            lexer = Parser.get().lexer(engine, lineno)
+            lexer.input(data)
+            try:
+                while True:
+                    t = lexer.token()
+                    if t is None:
+                        break
+                    result.append((t.type, t.value, t.lineno, t.lexpos))
+            except Exception, e:
+                result.append(('exception', str(e)))
+            reported = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+        return (result, reported)
+
+    def check(self, data, label, lineno=1):
+        ply = self.tokens('ply', data, lineno)
+        scanner = self.tokens('scanner', data, lineno)
+        if ply[0] != scanner[0]:
+            for n, (a, b) in enumerate(zip(ply[0], scanner[0])):
+                if a != b:
+                    break
+            else:
+                n = min(len(ply[0]), len(scanner[0]))
+            self.fail('%s: token %d\n  ply: %r\n  scanner: %r\n  input: %r' % (
+                label,
+                n,
+                ply[0][n:n+1],
+                scanner[0][n:n+1],
+                data[:200]))
+        self.assertEqual(ply[1], scanner[1], '%s: errors reported' % label)
+        return ply
+
+    def test_samples(self):
+        for path, data in samples():
+            self.check(data, os.path.basename(path))
+
+    def test_lineno(self):
+        for path, data in samples():
+            self.check(data, os.path.basename(path), 10)
+
+    def test_crlf(self):
+        for path, data in samples():
+            label = os.path.basename(path)
+            tokens, reported = self.check(data, label)
+            crlf = self.check(data.replace('\n', '\r\n'), '%s (crlf)' % label)
+            self.assertEqual(
+                [t[:3] for t in crlf[0]],
+                [t[:3] for t in tokens],
+                '%s (crlf): tokens' % label)
+            self.assertEqual(crlf[1], reported, '%s (crlf): errors reported' % label)
+
+    def test_generated(self):
+        text = [data for path, data in samples()]
+        generator = random.Random(1)
+        for n in range(GENERATED):
+            size = generator.randint(1, 40)
+            data = ''.join([generator.choice(FRAGMENTS) for i in range(size)])
+            if text and generator.random() < 0.3:
+                s = generator.choice(text)
+                i = generator.randint(0, len(s))
+                data = s[:i] + data + s[i:]
+            self.check(data, 'generated %d' % n)
+
+
+if __name__ == '__main__':
+    unittest.main()
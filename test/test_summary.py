@@ -0,0 +1,61 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# The summary counts the units processed: each file or, with
+# --fold, all of the files as one.
+#
+
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from launcher import chameleon, SAMPLES
+
+GOOD = ['sample.sql', 'upgrade.sql']
+
+BROKEN = ['broken.sql']
+
+
+class Summary(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp)
+
+    def chameleon(self, options, files):
+        arguments = options + [os.path.join(SAMPLES, fn) for fn in files]
+        output = chameleon(arguments, self.tmp)
+        match = re.search(r'\(succeeded: (\d+), failed: (\d+)', output)
+        if match is None:
+            self.fail('summary not reported:\n%s' % output)
+        return tuple(int(n) for n in match.groups())
+
+    def test_files(self):
+        self.assertEqual(self.chameleon([], GOOD), (2, 0))
+        self.assertEqual(self.chameleon([], GOOD+BROKEN), (2, 1))
+
+    def test_fold(self):
+        self.assertEqual(self.chameleon(['--fold'], GOOD), (1, 0))
+        self.assertEqual(self.chameleon(['--fold'], GOOD+BROKEN), (0, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# The LALR tables are generated and cached in the user cache; when
+# the cache cannot be written, they are generated for each run.
+#
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from launcher import chameleon, ROOT, SAMPLES
+
+sys.path.insert(0, ROOT)
+
+from chameleon.parser import Parser, Tables
+
+
+class Unwritable(Tables):
+    """ tables whose pickle file cannot be written (as by older PLY) """
+
+    def build(self, path, optimized=0):
+        if path.endswith('.tmp'):
+            raise IOError(20, 'Not a directory', path)
+        return Tables.build(self, path, optimized)
+
+
+class Cache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_generate(self):
+        path = os.path.join(self.tmp, 'file')
+        open(path, 'w').close()
+        parser = Unwritable().generate(path)
+        lexer = Parser.get().lexer()
+        script = parser.parse('create table a (id integer);', lexer=lexer)
+        self.assertEqual(len(script), 1)
+
+    def test_unwritable(self):
+        open(os.path.join(self.tmp, 'file'), 'w').close()
+        sample = os.path.join(SAMPLES, 'sample.sql')
+        output = chameleon([sample], self.tmp, 'file')
+        self.assertTrue('(succeeded: 1, failed: 0' in output, output)
+
+
+if __name__ == '__main__':
+    unittest.main()